@@ -0,0 +1,343 @@
+# api.py
+import argparse
+import hashlib
+import json
+import logging
+import math
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import pandas as pd
+
+from catalogo import Catalogo
+from dados import ABAS, COL_ESCOLA, SERIES_COMPLETUDE
+from instrumentacao import contar_cache, medir
+
+logger = logging.getLogger(__name__)
+
+
+# ===============================================================
+# Configuração
+# ===============================================================
+PORTA_PADRAO = 8502
+
+# Respostas prontas (corpo JSON + ETag) mantidas em memória
+MAX_RESPOSTAS = 2048
+
+
+class ErroAPI(Exception):
+    def __init__(self, status: int, mensagem: str):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+
+
+# ===============================================================
+# Conversão para JSON
+# ===============================================================
+def _valor(v):
+    if v is None or (isinstance(v, float) and math.isnan(v)):
+        return None
+    if isinstance(v, float):
+        # métricas ficam em float32: arredonda para não expor ruído de precisão
+        return round(v, 4)
+    return v
+
+
+def registros(df_: pd.DataFrame) -> list:
+    """
+    Linhas como lista de dicts (NaN -> null; categorias como texto).
+    """
+    colunas = list(df_.columns)
+    return [
+        {c: _valor(v) for c, v in zip(colunas, linha)}
+        for linha in df_.astype(object).itertuples(index=False, name=None)
+    ]
+
+
+def lista(valores) -> list:
+    return [_valor(float(v)) for v in valores]
+
+
+# ===============================================================
+# Rotas (cada uma devolve um objeto serializável)
+# ===============================================================
+def _aba(chave: str) -> str:
+    if chave not in ABAS or chave == "original":
+        raise ErroAPI(404, f"aba desconhecida: {chave}")
+    return chave
+
+
+def _regional(dados, regional: str) -> str:
+    if not any(regional in dados.indice[chave] for chave in ABAS if chave != "original"):
+        raise ErroAPI(404, f"regional não encontrada: {regional}")
+    return regional
+
+
+def listar_regionais(dados) -> dict:
+    nomes = set()
+    for chave in ABAS:
+        if chave != "original":
+            nomes.update(str(r) for r in dados.indice[chave])
+    return {"regionais": sorted(nomes)}
+
+
+def resumo_regional(dados, regional: str) -> dict:
+    """
+    Linha-resumo e número de escolas da regional em cada aba.
+    """
+    abas = {}
+    for chave in ABAS:
+        if chave == "original":
+            continue
+        particao = dados.particao(chave, regional)
+        abas[chave] = {
+            "escolas": len(particao.escolas),
+            "resumo": registros(particao.resumo)[0] if not particao.resumo.empty else None,
+        }
+    return {"regional": regional, "abas": abas}
+
+
+def agregados_estado(dados) -> dict:
+    """
+    Agregado de todas as escolas do estado por aba, série e etapa (mesmas
+    regras das linhas-resumo das regionais).
+    """
+    return {
+        chave: {
+            "etapas": dados.etapas[chave].etapas,
+            "series": {serie: lista(agregados.estado) for serie, agregados in series.items()},
+        }
+        for chave, series in dados.agregados.items()
+    }
+
+
+def tabela_regional(dados, regional: str, chave: str) -> dict:
+    particao = dados.particao(chave, regional)
+    return {
+        "regional": regional,
+        "aba": chave,
+        "etapas": dados.etapas[chave].etapas,
+        "escolas": registros(particao.escolas),
+        "resumo": registros(particao.resumo)[0] if not particao.resumo.empty else None,
+    }
+
+
+def series_escola(dados, regional: str, chave: str, escola: str) -> dict:
+    """
+    Linha da escola e, nas abas com etapas, as séries por etapa com
+    variações e posições (as mesmas do hover do painel).
+    """
+    if chave in SERIES_COMPLETUDE:
+        rotulo = dados.escolas_validas(chave, regional).linha_por_escola.get(escola)
+    else:
+        escolas = dados.particao(chave, regional).escolas
+        rotulos = escolas.index[escolas[COL_ESCOLA].astype(str) == escola]
+        rotulo = rotulos[0] if len(rotulos) else None
+    if rotulo is None:
+        raise ErroAPI(404, f"escola não encontrada em {regional}/{chave}: {escola}")
+
+    linha = dados[chave].loc[[rotulo]]
+    resposta = {
+        "regional": regional,
+        "aba": chave,
+        "escola": escola,
+        "linha": registros(linha)[0],
+        "etapas": dados.etapas[chave].etapas,
+        "series": {},
+    }
+    for serie, cols in dados.etapas[chave].series.items():
+        var = dados.variacoes[chave][serie]
+        item = {
+            "valores": lista(linha[cols].iloc[0]),
+            "variacao_absoluta": lista(var.absoluta.loc[rotulo, cols]),
+            "variacao_relativa": lista(var.relativa.loc[rotulo, cols]),
+        }
+        if chave in dados.posicoes:
+            pos = dados.posicoes[chave][serie]
+            item |= {
+                nome: lista(getattr(pos, nome).loc[rotulo, cols])
+                for nome in pos._fields
+            }
+        resposta["series"][serie] = item
+    return resposta
+
+
+def buscar(dados, parametros: dict) -> dict:
+    termo = parametros.get("q", "")
+    chave = parametros.get("aba", "redacao")
+    if chave not in dados.busca:
+        raise ErroAPI(400, f"busca disponível só em: {', '.join(dados.busca)}")
+    resultados = dados.busca[chave].buscar(termo, regional=parametros.get("regional"))
+    return {"resultados": [r._asdict() for r in resultados]}
+
+
+def escolher_planilha(catalogo: Catalogo, parametros: dict):
+    """
+    Entrada do catálogo pedida em ?planilha=<rótulo> (padrão: a mais recente).
+    """
+    entradas = catalogo.entradas()
+    if not entradas:
+        raise ErroAPI(503, "nenhuma planilha registrada no catálogo")
+    rotulo = parametros.get("planilha")
+    if not rotulo:
+        return entradas[0]
+    for entrada in entradas:
+        if entrada.rotulo == rotulo:
+            return entrada
+    raise ErroAPI(404, f"planilha não encontrada: {rotulo}")
+
+
+def depende_do_catalogo(caminho: str) -> bool:
+    """
+    Rotas que listam o catálogo: a resposta muda quando uma planilha é
+    registrada, mesmo sem mudar a versão da planilha padrão.
+    """
+    return caminho.strip("/") in ("", "planilhas")
+
+
+def resolver(catalogo: Catalogo, dados, caminho: str, parametros: dict):
+    """
+    Despacha a rota e devolve o objeto da resposta.
+    """
+    partes = [unquote(p) for p in caminho.strip("/").split("/") if p]
+
+    match partes:
+        case [] | ["planilhas"]:
+            corpo = {
+                "planilhas": [
+                    {"rotulo": e.rotulo, "ano": e.ano, "ciclo": e.ciclo}
+                    for e in catalogo.entradas()
+                ]
+            }
+        case ["regionais"]:
+            corpo = listar_regionais(dados)
+        case ["regionais", regional]:
+            corpo = resumo_regional(dados, _regional(dados, regional))
+        case ["regionais", regional, chave]:
+            corpo = tabela_regional(dados, _regional(dados, regional), _aba(chave))
+        case ["regionais", regional, chave, "escolas", escola]:
+            corpo = series_escola(dados, _regional(dados, regional), _aba(chave), escola)
+        case ["estado"]:
+            corpo = agregados_estado(dados)
+        case ["busca"]:
+            corpo = buscar(dados, parametros)
+        case _:
+            raise ErroAPI(404, "rota desconhecida")
+    return corpo
+
+
+# ===============================================================
+# Cache de respostas (corpo pronto + ETag), por versão dos dados
+# ===============================================================
+class CacheRespostas:
+    """
+    LRU das respostas já serializadas. A chave inclui a versão dos dados,
+    então uma recarga do Excel não serve resposta antiga; as entradas da
+    versão anterior saem pelo LRU.
+    """
+
+    def __init__(self, maximo: int = MAX_RESPOSTAS):
+        self.maximo = maximo
+        self._lock = threading.Lock()
+        self._itens = OrderedDict()
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                self._itens.move_to_end(chave)
+            return item
+
+    def guardar(self, chave, item) -> None:
+        with self._lock:
+            self._itens[chave] = item
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.maximo:
+                self._itens.popitem(last=False)
+
+
+# ===============================================================
+# Servidor HTTP (somente leitura)
+# ===============================================================
+class ManipuladorAPI(BaseHTTPRequestHandler):
+    catalogo = None
+    respostas = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parametros = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        with medir("api_requisicao"):
+            try:
+                # versão atual da planilha: só uma consulta ao gerenciador
+                dados = self.catalogo.dados(escolher_planilha(self.catalogo, parametros))
+                versao = (
+                    tuple(self.catalogo.entradas()) if depende_do_catalogo(url.path)
+                    else dados.versao
+                )
+                chave = (versao, url.path, tuple(sorted(parametros.items())))
+                item = self.respostas.obter(chave)
+                contar_cache("api_respostas", acerto=item is not None)
+                if item is None:
+                    corpo = resolver(self.catalogo, dados, url.path, parametros)
+                    conteudo = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+                    etag = '"' + hashlib.sha256(conteudo).hexdigest()[:32] + '"'
+                    item = (conteudo, etag)
+                    self.respostas.guardar(chave, item)
+            except ErroAPI as e:
+                return self._enviar(e.status, json.dumps({"erro": e.mensagem}, ensure_ascii=False).encode("utf-8"))
+            except Exception:
+                logger.exception("Erro em %s", self.path)
+                return self._enviar(500, b'{"erro": "erro interno"}')
+
+        conteudo, etag = item
+        if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+            return self._enviar(304, b"", etag)
+        return self._enviar(200, conteudo, etag)
+
+    def _enviar(self, status: int, conteudo: bytes, etag: str = None) -> None:
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            # sempre revalidar: com a ETag, a revalidação custa um 304 sem corpo
+            self.send_header("Cache-Control", "no-cache")
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(conteudo)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(conteudo)
+
+    def log_message(self, formato, *args):
+        logger.debug("%s - %s", self.address_string(), formato % args)
+
+
+def criar_servidor(host: str = "127.0.0.1", porta: int = PORTA_PADRAO,
+                   catalogo: Catalogo = None) -> ThreadingHTTPServer:
+    ManipuladorAPI.catalogo = catalogo or Catalogo()
+    ManipuladorAPI.respostas = CacheRespostas()
+    return ThreadingHTTPServer((host, porta), ManipuladorAPI)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="API JSON (somente leitura) com os dados do painel")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    servidor = criar_servidor(args.host, args.porta)
+    logger.info("API em http://%s:%d/regionais", args.host, args.porta)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,180 +1,101 @@
 # app.py
+import json
+import os
+from functools import wraps
+
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
+
+from instrumentacao import (
+    chamar_em_cache,
+    cronometrado,
+    finalizar_rerun,
+    iniciar_rerun,
+    marcar_falta,
+    medir,
+    rerun_em_andamento,
+    resumo_caches,
+    resumo_etapas,
+)
 
 # ===============================================================
 # Configuração da página (painel mais largo)
 # ===============================================================
 st.set_page_config(layout="wide")
 
+# Tempos por etapa deste rerun (ver instrumentacao.py)
+iniciar_rerun()
 
-# ===============================================================
-# Constantes de colunas
-# ===============================================================
-COL_CODIGO   = "Código Interno"
-COL_REGIONAL = "Regional"
-COL_ESCOLA   = "Escola"
-
-# Colunas de Redação
-COL_PART_RED = [
-    "1º Simulado: Participação (%)",
-    "1º Teste de Redação: Participação (%)",
-    "2º Teste de Redação: Participação (%)",
-    "2º Simulado: Participação (%)",
-    "3º Teste de Redação: Participação (%)",
-    "4º Teste de Redação: Participação (%)",
-]
-
-COL_NOTAS_RED = [
-    "1º Simulado: Nota",
-    "1º Teste de Redação: Nota",
-    "2º Teste de Redação: Nota",
-    "2º Simulado: Nota",
-    "3º Teste de Redação: Nota",
-    "4º Teste de Redação: Nota",
-]
-
-# Colunas de Objetivas
-COL_PART_OBJ = [
-    "Objetivas - 1º Simulado: Participação (%)",
-    "Objetivas - 2º Simulado: Participação (%)",
-]
-
-COL_ACERTOS_OBJ = [
-    "Objetivas - 1º Simulado: Acertos (%)",
-    "Objetivas - 2º Simulado: Acertos (%)",  # ajuste se o nome estiver ligeiramente diferente
-]
-
-
-# ===============================================================
-# Funções auxiliares
-# ===============================================================
-def serie_para_float(s: pd.Series, eh_percentual: bool = False) -> pd.Series:
-    """
-    Converte uma Series com valores tipo '85,12%' / '202,71'
-    em float. Se eh_percentual=True, remove '%'.
-    """
-    s = s.astype(str).str.strip()
-
-    if eh_percentual:
-        s = s.str.replace('%', '', regex=False)
-
-    # remove separador de milhar e troca vírgula por ponto
-    s = s.str.replace('.', '', regex=False)
-    s = s.str.replace(',', '.', regex=False)
-
-    return pd.to_numeric(s, errors="coerce")
-
-
-
-def calcular_variacao(valores) -> list:
-    """
-    Retorna lista com variação (com sinal) em relação ao ponto anterior.
-    Primeiro ponto recebe 0.0.
-    """
-    vals = []
-    for v in valores:
-        if v is None or (isinstance(v, float) and pd.isna(v)):
-            vals.append(None)
-        else:
-            vals.append(float(v))
-
-    variacoes = [0.0]
-    for i in range(1, len(vals)):
-        if vals[i] is not None and vals[i - 1] is not None:
-            variacoes.append(vals[i] - vals[i - 1])  # COM SINAL
-        else:
-            variacoes.append(0.0)
-    return variacoes
-
-
-
-def fmt_num_br(v):
-    if pd.isna(v):
-        return ""
-    return f"{v:.2f}".replace(".", ",")
-
-
-
-def fmt_percent_br(v):
-    if pd.isna(v):
-        return ""
-    # v aqui é fração (0–1), multiplicamos por 100 pra mostrar
-    return f"{v*100:.2f}%".replace(".", ",")
-
-
-
-def fmt_nota_br(v):
-    if pd.isna(v):
-        return ""
-    return f"{v:.2f}".replace(".", ",")
-
-
-
-def fmt_int(v):
-    if pd.isna(v):
-        return ""
-    return f"{int(round(v))}"
+# Título antes de qualquer import pesado: num processo novo o navegador já
+# mostra o cabeçalho enquanto pandas/pyarrow carregam. Plotly e a paginação
+# só são importados quando um gráfico ou uma tabela paginada aparece.
+st.title("Painel de Participação e Desempenhos")
 
+with medir("importar_dados"):
+    from aquecimento import AQUECIMENTO_ATIVO, Aquecedor, limite_cache_figuras
+    from catalogo import Catalogo
+    from dados import COL_CODIGO, COL_ESCOLA, COL_REGIONAL, colunas_numericas
+    from metricas import colunas_posicao, colunas_variacao
 
 
 # ===============================================================
 # 1) Carregar dados do Excel
 # ===============================================================
-@st.cache_data
+@st.cache_resource
 def load_data():
-    xls = pd.ExcelFile("Dados_RJ.xlsx")
-
-    def read_sheet(sheet_name):
-        df_ = pd.read_excel(xls, sheet_name=sheet_name, dtype=str)
-        df_.columns = (
-            df_.columns
-            .str.strip()
-            .str.replace('\ufeff', '', regex=False)
-        )
-        return df_
-
-    df_original   = read_sheet("Original")
-    df_redacao    = read_sheet("Dados_Redação")
-    df_objetivas  = read_sheet("Dados_Objetivas")
-    df_particip   = read_sheet("Dados_Participação")
-    df_acessos    = read_sheet("Dados_Acesso_Detalhado")
-
-    return {
-        "original": df_original,
-        "redacao": df_redacao,
-        "objetivas": df_objetivas,
-        "participacao": df_particip,
-        "acessos": df_acessos,
-    }
+    # Catálogo único por processo (uma planilha por ano/ciclo). Cada planilha
+    # só é carregada quando selecionada: abas já tipadas (do snapshot colunar
+    # quando o Excel não mudou, ou do pacote pré-montado por
+    # `python catalogo.py construir`; openpyxl só quando o hash muda), com índice,
+    # escolas válidas etc. calculados uma vez por versão. Quando o Excel é
+    # substituído, a nova versão é montada em segundo plano e trocada de uma
+    # vez; até lá as sessões seguem com a versão anterior.
+    marcar_falta()
+    return Catalogo()
+
+
+catalogo = chamar_em_cache("load_data", load_data)
+planilhas = catalogo.entradas()
+if not planilhas:
+    st.error("Nenhuma planilha registrada no catálogo.")
+    st.stop()
 
+# Seletor de ano/ciclo só aparece quando há mais de uma planilha
+planilha = planilhas[0]
+if len(planilhas) > 1:
+    planilha = st.sidebar.selectbox(
+        "Ano / ciclo",
+        planilhas,
+        format_func=lambda e: e.rotulo,
+        key="planilha_escolhida",
+    )
 
-data = load_data()
+with medir("carregar_particao"):
+    data = catalogo.dados(planilha)
 df_redacao   = data["redacao"]
 df_objetivas = data["objetivas"]
 df_part      = data["participacao"]
 df_acessos   = data["acessos"]
 
-st.title("Painel de Participação e Desempenhos")
-
 # ===============================================================
 # 2) Seleção de regional (com base na união das abas)
 # ===============================================================
-regionais_set = set()
+# A união só é refeita quando a versão dos dados muda; nos demais reruns a
+# lista vem da sessão
+if st.session_state.get("regionais_no_arquivo", (None,))[0] != data.versao:
+    regionais_set = set()
 
-for df_src in [df_redacao, df_objetivas, df_part, df_acessos]:
-    if COL_REGIONAL in df_src.columns:
-        regionais_set.update(df_src[COL_REGIONAL].dropna().unique())
+    for df_src in [df_redacao, df_objetivas, df_part, df_acessos]:
+        if COL_REGIONAL in df_src.columns:
+            regionais_set.update(df_src[COL_REGIONAL].dropna().unique())
 
-regionais_no_arquivo = sorted(regionais_set)
+    # Remove a regional "DE UNIDADES ESCOLARES PRISIONAIS E SOCIOEDUCATIVAS"
+    nome_excluir = "DE UNIDADES ESCOLARES PRISIONAIS E SOCIOEDUCATIVAS".upper()
+    st.session_state["regionais_no_arquivo"] = (data.versao, [
+        r for r in sorted(regionais_set)
+        if isinstance(r, str) and r.strip().upper() != nome_excluir
+    ])
 
-# Remove a regional "DE UNIDADES ESCOLARES PRISIONAIS E SOCIOEDUCATIVAS"
-nome_excluir = "DE UNIDADES ESCOLARES PRISIONAIS E SOCIOEDUCATIVAS".upper()
-regionais_no_arquivo = [
-    r for r in regionais_no_arquivo
-    if isinstance(r, str) and r.strip().upper() != nome_excluir
-]
+regionais_no_arquivo = st.session_state["regionais_no_arquivo"][1]
 
 
 if not regionais_no_arquivo:
@@ -188,6 +109,7 @@ st.markdown(
 regional_escolhida = st.selectbox(
     "Selecione a Regional",        # label NÃO vazio
     regionais_no_arquivo,
+    key="regional_escolhida",      # permite que a busca troque a regional
     label_visibility="collapsed",  # esconde visualmente o label nativo
 )
 
@@ -197,6 +119,11 @@ regional_escolhida = st.selectbox(
 # ===============================================================
 # 3) Abas laterais
 # ===============================================================
+# Aba de administração (qualidade dos dados): ?admin=1 na URL ou
+# PAINEL_ADMIN=1 no servidor
+ABA_QUALIDADE = "Qualidade dos dados"
+modo_admin = st.query_params.get("admin") == "1" or os.environ.get("PAINEL_ADMIN") == "1"
+
 aba = st.sidebar.radio(
     "Selecione a aba",   # qualquer texto não vazio
     [
@@ -204,335 +131,363 @@ aba = st.sidebar.radio(
         "Desempenhos nas Provas Objetivas",
         "Tempos e Volumes de Participação nas Aplicações",
         "Detalhamento de Acessos",
-    ],
+    ] + ([ABA_QUALIDADE] if modo_admin else []),
     label_visibility="collapsed",  # esconde o texto, mas o label existe
 )
 
 
+# Painel de diagnóstico: ?debug=1 na URL ou PAINEL_DEBUG=1 no servidor.
+# Mostra o último rerun completo da sessão e os totais do processo.
+if st.query_params.get("debug") == "1" or os.environ.get("PAINEL_DEBUG") == "1":
+    with st.sidebar.expander("Diagnóstico: tempos e caches"):
+        ultimo = st.session_state.get("metricas_ultimo_rerun")
+        if ultimo:
+            parcial = f" (só {ultimo['fragmento']})" if "fragmento" in ultimo else ""
+            st.caption(f"Último rerun{parcial}: {ultimo['total_ms']:.1f} ms")
+            st.dataframe(
+                [{"etapa": k, "ms": v} for k, v in ultimo["etapas_ms"].items()],
+                hide_index=True,
+            )
+        st.caption("Etapas (processo)")
+        st.dataframe(resumo_etapas(), hide_index=True)
+        st.caption("Caches (processo)")
+        st.dataframe(resumo_caches(), hide_index=True)
+
+
 
 # ===============================================================
-# 4) Função auxiliar: filtrar escolas válidas (sem faltantes) por aba
+# 3.1) Fragmentos: partes da página que reexecutam sozinhas
 # ===============================================================
-def filtrar_escolas_validas(df_base: pd.DataFrame, cols_part, cols_notas_ou_acertos, percentual_notas: bool):
+def fragmento(nome: str):
     """
-    Retorna df_regional_valid (apenas linhas sem NaN nas colunas indicadas).
+    st.fragment com medição: um widget dentro do fragmento reexecuta só a
+    função, com os argumentos do último rerun completo. Dentro de um rerun
+    completo o tempo entra como etapa dele; num rerun só do fragmento vira
+    um registro próprio (evento "fragmento").
     """
-    df_reg_regional = df_base[df_base[COL_REGIONAL] == regional_escolhida].copy()
-    if df_reg_regional.empty:
-        return df_reg_regional, df_reg_regional  # vazio
-
-    df_num = df_reg_regional.copy()
-
-    # Converter colunas numéricas para detectar NaN
-    for c in cols_part:
-        if c in df_num.columns:
-            df_num[c] = serie_para_float(df_num[c], eh_percentual=True)
-    for c in cols_notas_ou_acertos:
-        if c in df_num.columns:
-            df_num[c] = serie_para_float(df_num[c], eh_percentual=percentual_notas)
-
-    mask_valid = (
-        df_num[cols_part].notna().all(axis=1) &
-        df_num[cols_notas_ou_acertos].notna().all(axis=1)
-    )
+    def decorador(funcao):
+        @st.fragment
+        @wraps(funcao)
+        def envolvida(*args, **kwargs):
+            if rerun_em_andamento():
+                with medir(nome):
+                    return funcao(*args, **kwargs)
+            iniciar_rerun()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                st.session_state["metricas_ultimo_rerun"] = finalizar_rerun(
+                    evento="fragmento", fragmento=nome,
+                    aba=aba, regional=regional_escolhida, versao=data.versao[:12],
+                )
+        return envolvida
+    return decorador
 
-    df_valid = df_reg_regional[mask_valid].copy()
-    return df_reg_regional, df_valid
 
 
+# ===============================================================
+# 4) Função auxiliar: escolas válidas (sem faltantes) por aba
+# ===============================================================
+@cronometrado("filtrar_escolas_validas")
+def filtrar_escolas_validas(chave_aba: str):
+    """
+    Retorna (df_regional, escolas válidas da regional). As escolas válidas
+    de todas as regionais são calculadas uma vez por versão do Excel.
+    """
+    df_reg_regional = data.particao(chave_aba, regional_escolhida).todas
+    return df_reg_regional, data.escolas_validas(chave_aba, regional_escolhida)
+
+
+
+def ir_para_escola(regional: str, escola: str, chave_dropdown: str, chave_busca: str):
+    """
+    Callback da busca: troca regional e escola selecionadas e limpa a busca.
+    """
+    st.session_state["regional_escolhida"] = regional
+    st.session_state[chave_dropdown] = escola
+    st.session_state[chave_busca] = ""
+
+
+
+def aplicar_busca(chave_aba: str, termo_busca: str, todo_estado: bool,
+                  escola_dropdown, chave_dropdown: str, chave_busca: str):
+    """
+    Resolve a escola exibida a partir do termo de busca, usando o índice de
+    busca (sem acentos, por trecho do nome ou Código Interno). Sem termo,
+    ou sem resultado na regional atual, mantém a escola do dropdown.
+    """
+    if not termo_busca:
+        return escola_dropdown
+
+    # Resultados guardados na sessão: reruns com o mesmo termo não refazem a busca
+    consulta = (data.versao, chave_aba, termo_busca, None if todo_estado else regional_escolhida)
+    anterior = st.session_state.get(f"{chave_busca}_consulta")
+    if anterior is not None and anterior[0] == consulta:
+        resultados = anterior[1]
+    else:
+        resultados = data.busca[chave_aba].buscar(termo_busca, regional=consulta[3])
+        st.session_state[f"{chave_busca}_consulta"] = (consulta, resultados)
+    if not resultados:
+        st.info("Nenhuma escola encontrada para esse termo de busca.")
+        return escola_dropdown
+
+    escolhido = resultados[0]
+    if len(resultados) > 1:
+        escolhido = st.selectbox(
+            "Resultados da busca",
+            resultados,
+            format_func=lambda r: f"{r.escola} ({r.regional})" if todo_estado else r.escola,
+            key=f"{chave_busca}_resultados",
+        )
+
+    if escolhido.regional != regional_escolhida:
+        st.info(f"A escola **{escolhido.escola}** é da regional **{escolhido.regional}**.")
+        if st.button(
+            f"Abrir na regional {escolhido.regional}",
+            on_click=ir_para_escola,
+            args=(escolhido.regional, escolhido.escola, chave_dropdown, chave_busca),
+        ):
+            # a busca roda dentro de um fragmento; a troca de regional
+            # precisa do script inteiro
+            st.rerun(scope="app")
+        return escola_dropdown
 
-fig = go.Figure()
+    st.caption(f"Busca: usando a escola **{escolhido.escola}**")
+    return escolhido.escola
 
 
 
 # ===============================================================
-# 5) ABA: Desempenhos em Redação
+# 4.1) Formatação das tabelas
 # ===============================================================
-if aba == "Desempenhos em Redação":
-    # Filtra regionais e escolas válidas
-    if COL_REGIONAL not in df_redacao.columns:
-        st.error(f"A aba Dados_Redação não possui a coluna '{COL_REGIONAL}'.")
-        st.stop()
+def config_numerico(percentuais=(), decimais=(), inteiros=()) -> dict:
+    """
+    column_config do st.dataframe: as colunas seguem numéricas (ordenação por
+    valor, não por texto) e o navegador formata no locale do usuário, sem
+    formatar célula a célula em Python. Percentuais vêm como fração 0–1.
+    """
+    config = {c: st.column_config.NumberColumn(format="percent") for c in percentuais}
+    config |= {c: st.column_config.NumberColumn(format="localized") for c in decimais}
+    config |= {c: st.column_config.NumberColumn(format="%.0f") for c in inteiros}
+    return config
 
-    for c in COL_PART_RED + COL_NOTAS_RED:
-        if c not in df_redacao.columns:
-            st.error(f"Coluna '{c}' não encontrada em Dados_Redação.")
-            st.stop()
 
-    df_reg_red, df_reg_red_valid = filtrar_escolas_validas(
-        df_redacao, COL_PART_RED, COL_NOTAS_RED, percentual_notas=False
-    )
 
-    if df_reg_red_valid.empty:
-        st.warning("Nenhuma escola desta regional possui todos os dados de redação completos.")
-        st.stop()
+def mostrar_tabela(nome: str, df_tabela, column_config: dict):
+    # serialização para o navegador (Arrow) cronometrada por tabela
+    with medir(f"tabela_{nome}"):
+        st.dataframe(
+            df_tabela,
+            column_config=column_config,
+            use_container_width=True,
+            hide_index=True,
+        )
 
-    # Escolha de escola + busca (apenas escolas sem faltantes)
-    escolas_validas = sorted(df_reg_red_valid[COL_ESCOLA].dropna().unique())
 
-    # Remove a linha da regional da lista de escolas (comparação robusta)
-    reg_norm = regional_escolhida.strip().upper()
-    escolas_validas = [
-        e for e in escolas_validas
-        if isinstance(e, str) and e.strip().upper() != reg_norm
-    ]
 
-    col1, col2 = st.columns([1, 1])
+# Tabelas grandes: filtro, ordenação e paginação no servidor
+TAMANHOS_PAGINA = [25, 50, 100, 250]
+
+
+
+@fragmento("fragmento_tabela_paginada")
+def tabela_paginada(nome: str, df_tabela, cols_ordenaveis, column_config: dict, converter=None):
+    """
+    Filtra (por nome da escola) e ordena sobre as colunas tipadas e envia ao
+    navegador só a página visível. `converter` recebe apenas as linhas da
+    página (ex.: percentuais para fração 0–1). Filtro, ordem e página
+    reexecutam só esta tabela.
+    """
+    col1, col2, col3, col4 = st.columns([3, 3, 1, 1])
     with col1:
-        st.markdown(
-        "<div style='font-size:22px; margin-bottom:10px;'>Selecione a Escola:</div>",
-        unsafe_allow_html=True
+        termo = st.text_input("Filtrar escola", key=f"filtro_{nome}")
+    with col2:
+        coluna_ordem = st.selectbox(
+            "Ordenar por", [COL_ESCOLA] + list(cols_ordenaveis), key=f"ordem_{nome}"
         )
-        escola_dropdown = st.selectbox(
-        "Escola",
-        escolas_validas,
-        key="escola_dropdown_red",
-        label_visibility="collapsed",
+    with col3:
+        sentido = st.selectbox("Ordem", ["Crescente", "Decrescente"], key=f"sentido_{nome}")
+    with col4:
+        tamanho = st.selectbox("Por página", TAMANHOS_PAGINA, key=f"tamanho_{nome}")
+
+    from tabelas import paginar
+
+    chave_pagina = f"pagina_{nome}"
+    pagina = paginar(
+        df_tabela, COL_ESCOLA, termo, coluna_ordem, sentido == "Crescente",
+        tamanho, st.session_state.get(chave_pagina, 1),
     )
+    # filtro ou regional nova podem reduzir o número de páginas
+    st.session_state[chave_pagina] = pagina.pagina
 
-    with col2:
-        st.markdown(
-            "<div style='font-size:22px; margin-bottom:10px;'>Buscar escola:</div>",
-            unsafe_allow_html=True
-        )
-        termo_busca = st.text_input(
-            "Buscar escola",
-            key="busca_escola_red",
-            label_visibility="collapsed",  # esconde o label padrão do Streamlit
-        )
-        # termo_busca = st.text_input("Buscar escola", key="busca_escola_red")
+    df_pagina = df_tabela.iloc[pagina.posicoes]
+    if converter is not None:
+        df_pagina = converter(df_pagina)
+    mostrar_tabela(nome, df_pagina, column_config)
 
+    if pagina.total == 0:
+        st.caption("Nenhuma escola encontrada com esse filtro.")
+        return
+    inicio = (pagina.pagina - 1) * tamanho + 1
+    st.caption(f"Escolas {inicio}–{inicio + len(pagina.posicoes) - 1} de {pagina.total}")
+    if pagina.paginas > 1:
+        st.number_input("Página", min_value=1, max_value=pagina.paginas, step=1, key=chave_pagina)
 
-    escola_escolhida = escola_dropdown
-    if termo_busca:
-        termo_lower = termo_busca.lower()
-        filtradas = [e for e in escolas_validas if termo_lower in e.lower()]
-        if filtradas:
-            escola_escolhida = filtradas[0]
-            st.caption(f"Busca: usando a escola **{escola_escolhida}**")
-        else:
-            st.info("Nenhuma escola encontrada para esse termo de busca.")
 
-    df_escola = df_reg_red_valid[df_reg_red_valid[COL_ESCOLA] == escola_escolhida].copy()
-    if df_escola.empty:
-        st.warning("Não há dados completos para a escola selecionada.")
-        st.stop()
 
-    # Série única (primeira linha)
-    part = serie_para_float(df_escola[COL_PART_RED].iloc[0], eh_percentual=True)
-    notas = serie_para_float(df_escola[COL_NOTAS_RED].iloc[0], eh_percentual=False)
-
-    part_frac   = part / 100.0
-    notas_norm  = notas / 1000.0
-    var_part    = calcular_variacao(part)
-    var_notas   = calcular_variacao(notas)
-
-
-    etapas_red = [
-        "1º Simulado",
-        "1º Teste de Redação",
-        "2º Teste de Redação",
-        "2º Simulado",
-        "3º Teste de Redação",
-        "4º Teste de Redação",
-    ]
-
-    
-    # Participação (laranja, rótulo embaixo)
-    customdata_part = [
-        [part.iloc[i], var_part[i], 100*var_part[i]/part.iloc[i-1]] for i in range(len(part))
-    ]
-    fig.add_trace(
-        go.Scatter(
-            x=etapas_red,
-            y=part_frac,
-            mode="lines+markers+text",
-            name="Participação da escola",
-            text=[f"{v:.2f}%" if pd.notna(v) else "" for v in part],
-            textposition="top center",
-            marker=dict(color="#FF8C00"),
-            line=dict(color="#FF8C00"),
-            customdata=customdata_part,
-            hovertemplate=(
-                "Etapa: %{x}<br>"
-                "Participação: %{customdata[0]:.2f}%<br>"
-                "Variação Absoluta: %{customdata[1]:.2f}%<br>"
-                "Variação Relativa: %{customdata[2]:.2f}%<extra></extra>"
-            ),
-        )
-    )
+# ===============================================================
+# 4.2) Cache de figuras (JSON já montado, por versão dos dados)
+# ===============================================================
+@st.cache_resource
+def limite_figuras() -> int:
+    # Com o aquecimento ligado, o cache precisa comportar as figuras de todas
+    # as partições carregadas. Fixado uma vez por processo (pela planilha da
+    # primeira sessão): mudar max_entries recriaria o cache vazio
+    if not AQUECIMENTO_ATIVO:
+        return 256
+    return limite_cache_figuras(data, catalogo.max_carregadas)
 
 
-    # Notas (preto, rótulo em cima)
-    customdata_notas = [
-        [notas.iloc[i], var_notas[i], 100*var_notas[i]/notas.iloc[i-1]] for i in range(len(notas))
-    ]
-    fig.add_trace(
-        go.Scatter(
-            x=etapas_red,
-            y=notas_norm,
-            mode="lines+markers+text",
-            name="Média da escola",
-            text=[f"{v:.2f}" if pd.notna(v) else "" for v in notas],
-            textposition="top center",
-            marker=dict(color="#000000"),
-            line=dict(color="#000000"),
-            customdata=customdata_notas,
-            hovertemplate=(
-                "Etapa: %{x}<br>"
-                "Nota: %{customdata[0]:.2f}<br>"
-                "Variação Absoluta: %{customdata[1]:.2f}<br>"
-                "Variação Relativa: %{customdata[2]:.2f}%<extra></extra>"
-            ),
-        )
-    )
+MAX_FIGURAS = int(os.environ.get("PAINEL_MAX_FIGURAS") or limite_figuras())
+
+
+@st.cache_data(max_entries=MAX_FIGURAS, show_spinner=False)
+def figura_json(aba_fig: str, regional: str, escola: str, versao: str, _dados) -> str:
+    """
+    JSON da figura de uma escola. LRU limitado; a versão dos dados faz parte
+    da chave, então reruns e idas e vindas entre abas não remontam a figura.
+    """
+    from graficos import FIGURAS
+
+    marcar_falta()
+    with medir(f"montar_figura_{aba_fig}"):
+        return FIGURAS[aba_fig](_dados, regional, escola).to_json()
 
 
 
-    # Série da REGIONAL (linha onde Escola ≈ nome da regional)
-    reg_norm = regional_escolhida.strip().upper()
-    mask_regional = (
-        df_reg_red[COL_ESCOLA]
-        .astype(str)
-        .str.strip()
-        .str.upper()
-        == reg_norm
+def mostrar_figura(aba_fig: str, escola: str):
+    import plotly.graph_objects as go
+
+    fig_json = chamar_em_cache(
+        "figura_json", figura_json, aba_fig, regional_escolhida, escola, data.versao, data
     )
-    df_regional_row = df_reg_red[mask_regional].copy()
+    # A figura foi validada pelo Plotly ao ser montada; aqui só reidrata o
+    # JSON, sem validar de novo cada traço
+    with medir("plotly_chart"):
+        fig = go.Figure(json.loads(fig_json), _validate=False)
+        st.plotly_chart(fig, use_container_width=True)
 
-    if not df_regional_row.empty:
-        part_reg = serie_para_float(
-            df_regional_row[COL_PART_RED].iloc[0], eh_percentual=True
-        )
-        notas_reg = serie_para_float(
-            df_regional_row[COL_NOTAS_RED].iloc[0], eh_percentual=False
-        )
 
-        part_reg_frac  = part_reg / 100.0
-        notas_reg_norm = notas_reg / 1000.0
-
-        # Linha pontilhada de PARTICIPAÇÃO da regional
-        fig.add_trace(
-            go.Scatter(
-                x=etapas_red,
-                y=part_reg_frac,
-                mode="lines+markers",
-                marker=dict(color="#FF8C00"),
-                name="Participação da regional",
-                line=dict(color="#FF8C00", dash="dot"),
-                hovertemplate=(
-                    "Etapa: %{x}<br>"
-                    "Participação da regional: %{y:.2%}<extra></extra>"
-                ),
-            )
-        )
 
+@st.cache_data(max_entries=64, show_spinner=False)
+def comparacao_json(aba_fig: str, serie: str, regional: str, escolas: tuple, versao: str, _dados) -> str:
+    from graficos import figura_comparacao
 
-        customdata_notas_reg = [
-        [notas_reg.iloc[i], var_notas[i]] for i in range(len(notas_reg))
-        ]
-
-        # Linha pontilhada de NOTAS da regional
-        fig.add_trace(
-            go.Scatter(
-                x=etapas_red,
-                y=notas_reg_norm,
-                customdata=customdata_notas_reg,
-                mode="lines+markers",
-                marker=dict(color="#000000"),
-                name="Média da regional",
-                line=dict(color="#000000", dash="dot"),
-                hovertemplate=(
-                    "Etapa: %{x}<br>"
-                    "Nota (Regional): %{customdata[0]:.2f}<extra></extra>"
-                ),
-            )
-        )
+    marcar_falta()
+    with medir("montar_figura_comparacao"):
+        return figura_comparacao(_dados, aba_fig, regional, escolas, serie).to_json()
 
 
-    fig.update_layout(
-        title=dict(
-            text=f"Desempenhos em Redação: {escola_escolhida}",
-            font=dict(size=26)  # só o título
-        ),
-        font=dict(size=16),     # resto (legenda, etc.)
-        height=800,
-        hoverlabel=dict(font_size=18),
-        legend=dict(
-        font=dict(size=16)  # <<< TAMANHO DA FONTE DA LEGENDA
-        ),
-        yaxis=dict(
-            title="",
-            range=[-0.2, 1.2],
-            showticklabels=False,
-        ),
-        xaxis=dict(
-            tickfont=dict(size=16)    # rótulos das etapas no eixo X
-        ),
-    )
 
-    st.plotly_chart(fig, use_container_width=True)
+@fragmento("fragmento_comparacao")
+def mostrar_comparacao(aba_fig: str, series: list, escolas: list, escola_atual: str, sufixo: str):
+    """
+    Sobreposição de várias escolas da regional (ou de todas) num só gráfico.
+    Trocar série ou escolas reexecuta só a comparação.
+    """
+    import plotly.graph_objects as go
+    from graficos import ROTULOS_SERIES
 
+    col1, col2 = st.columns([3, 1])
+    with col2:
+        serie = st.radio(
+            "Série",
+            series,
+            format_func=lambda s: ROTULOS_SERIES[s][0],
+            key=f"serie_comparacao_{sufixo}",
+        )
+        todas = st.checkbox("Todas as escolas da regional", key=f"comparar_todas_{sufixo}")
+    with col1:
+        selecionadas = st.multiselect(
+            "Escolas para comparar",
+            escolas,
+            default=[escola_atual],
+            key=f"escolas_comparacao_{sufixo}",
+            disabled=todas,
+        )
+
+    if todas:
+        selecionadas = escolas
+    if not selecionadas:
+        st.info("Selecione ao menos uma escola para comparar.")
+        return
+
+    fig_json = chamar_em_cache(
+        "comparacao_json", comparacao_json,
+        aba_fig, serie, regional_escolhida, tuple(selecionadas), data.versao, data,
+    )
+    with medir("plotly_chart"):
+        st.plotly_chart(go.Figure(json.loads(fig_json), _validate=False), use_container_width=True)
 
-    # Tabela da regional (Redação)
-    st.subheader("Participações e notas de redação da regional selecionada")
-    cols_tabela = [COL_CODIGO, COL_ESCOLA] + COL_PART_RED + COL_NOTAS_RED
-    df_tabela = df_reg_red[cols_tabela].copy()
 
-    # 1) converter para número
-    for c in COL_PART_RED:
-        df_tabela[c] = serie_para_float(df_tabela[c], eh_percentual=True) / 100.0  # fração 0–1
-    for c in COL_NOTAS_RED:
-        df_tabela[c] = serie_para_float(df_tabela[c], eh_percentual=False)
 
-    # 2) aplicar formatação, mantendo o tipo float
-    styler_red = df_tabela.style.format(
-        {c: fmt_percent_br for c in COL_PART_RED} |
-        {c: fmt_nota_br    for c in COL_NOTAS_RED}
+@st.cache_resource
+def aquecedor_figuras():
+    # Um por processo, registrado no catálogo: a cada versão carregada (ao
+    # subir e a cada recarga do Excel) monta em segundo plano as figuras de
+    # todas as regionais, pelo mesmo cache que o painel consulta
+    aquecedor = Aquecedor(
+        lambda chave, regional, escola, dados:
+            figura_json(chave, regional, escola, dados.versao, dados)
     )
+    catalogo.observar(aquecedor.aquecer)
+    return aquecedor
 
-    st.dataframe(styler_red, use_container_width=True, hide_index=True)
 
+if AQUECIMENTO_ATIVO:
+    aquecedor_figuras()
 
 
 
 # ===============================================================
-# 6) ABA: Desempenhos nas Provas Objetivas
+# 4.3) Relatório de qualidade (aba de administração)
 # ===============================================================
-elif aba == "Desempenhos nas Provas Objetivas":
-    # Conferência das colunas
-    if COL_REGIONAL not in df_objetivas.columns:
-        st.error(f"A aba Dados_Objetivas não possui a coluna '{COL_REGIONAL}'.")
-        st.stop()
+@st.cache_data(max_entries=4, show_spinner=False)
+def relatorio_qualidade(versao: str, _dados):
+    """
+    Verificações da planilha, calculadas uma vez por versão dos dados.
+    """
+    from qualidade import avaliar_qualidade
 
-    for c in COL_PART_OBJ + COL_ACERTOS_OBJ:
-        if c not in df_objetivas.columns:
-            st.error(f"Coluna '{c}' não encontrada em Dados_Objetivas.")
-            st.stop()
+    marcar_falta()
+    with medir("avaliar_qualidade"):
+        return avaliar_qualidade(_dados)
 
-    # Filtra linhas da regional e separa válidas (sem NaN nas colunas usadas)
-    df_reg_obj, df_reg_obj_valid = filtrar_escolas_validas(
-        df_objetivas, COL_PART_OBJ, COL_ACERTOS_OBJ, percentual_notas=True
-    )
 
-    if df_reg_obj_valid.empty:
-        st.warning("Nenhuma escola desta regional possui todos os dados de objetivas completos.")
-        st.stop()
+TITULOS_QUALIDADE = {
+    "nao_convertidas": "Células não numéricas",
+    "faltantes": "Valores de etapa ausentes",
+    "resumos_ausentes": "Regionais sem linha-resumo",
+    "codigos_duplicados": "Códigos repetidos",
+    "resumos_divergentes": "Resumos divergentes",
+}
 
-    # Lista de escolas da regional (sem a linha-resumo da própria regional)
-    escolas_validas = sorted(df_reg_obj_valid[COL_ESCOLA].dropna().unique())
-    reg_norm = regional_escolhida.strip().upper()
-    escolas_validas = [
-        e for e in escolas_validas
-        if isinstance(e, str) and e.strip().upper() != reg_norm
-    ]
 
-    # Se por algum motivo só existir a linha da regional, evita erro
-    if not escolas_validas:
-        st.warning("Para esta regional só há a linha-resumo; não há escolas individuais com dados completos.")
-        st.stop()
 
-    # Dropdown + busca
+# ===============================================================
+# 4.4) Escola selecionada e tabelas da regional (fragmentos)
+# ===============================================================
+@fragmento("fragmento_escola")
+def painel_escola(chave_aba: str, validas, series_comparacao: list, sufixo: str):
+    """
+    Dropdown, busca, gráfico da escola e comparação. Trocar a escola ou o
+    termo de busca reexecuta só este bloco: a tabela da regional não é
+    refeita nem reenviada.
+    """
+    escolas_validas = validas.nomes
+    chave_dropdown = f"escola_dropdown_{sufixo}"
+    chave_busca = f"busca_escola_{sufixo}"
+
     col1, col2 = st.columns([1, 1])
     with col1:
         st.markdown(
@@ -542,7 +497,7 @@ elif aba == "Desempenhos nas Provas Objetivas":
         escola_dropdown = st.selectbox(
             "Escola",
             escolas_validas,
-            key="escola_dropdown_obj",
+            key=chave_dropdown,
             label_visibility="collapsed",
         )
 
@@ -553,183 +508,187 @@ elif aba == "Desempenhos nas Provas Objetivas":
         )
         termo_busca = st.text_input(
             "Buscar escola",
-            key="busca_escola_obj",
-            label_visibility="collapsed",
+            key=chave_busca,
+            label_visibility="collapsed",  # esconde o label padrão do Streamlit
         )
+        todo_estado = st.checkbox("Buscar em todas as regionais", key=f"busca_estado_{sufixo}")
 
-    escola_escolhida = escola_dropdown
-    if termo_busca:
-        termo_lower = termo_busca.lower()
-        filtradas = [e for e in escolas_validas if termo_lower in e.lower()]
-        if filtradas:
-            escola_escolhida = filtradas[0]
-            st.caption(f"Busca: usando a escola **{escola_escolhida}**")
-        else:
-            st.info("Nenhuma escola encontrada para esse termo de busca.")
+    escola_escolhida = aplicar_busca(
+        chave_aba, termo_busca, todo_estado, escola_dropdown, chave_dropdown, chave_busca,
+    )
 
     # Linha da escola escolhida (dados completos)
-    df_escola = df_reg_obj_valid[df_reg_obj_valid[COL_ESCOLA] == escola_escolhida].copy()
-    if df_escola.empty:
+    if validas.linha_por_escola.get(escola_escolhida) is None:
         st.warning("Não há dados completos para a escola selecionada.")
-        st.stop()
+        return
 
-    # Séries da escola
-    part_obj    = serie_para_float(df_escola[COL_PART_OBJ].iloc[0], eh_percentual=True)
-    acertos_obj = serie_para_float(df_escola[COL_ACERTOS_OBJ].iloc[0], eh_percentual=True)
+    mostrar_figura(chave_aba, escola_escolhida)
 
-    part_obj_frac    = part_obj / 100.0
-    acertos_obj_frac = acertos_obj / 100.0
+    if st.checkbox("Comparar escolas da regional", key=f"comparar_{sufixo}"):
+        mostrar_comparacao(chave_aba, series_comparacao, escolas_validas, escola_escolhida, sufixo)
 
-    var_part_obj    = calcular_variacao(part_obj)
-    var_acertos_obj = calcular_variacao(acertos_obj)
 
-    etapas_obj = ["1º Simulado", "2º Simulado"]
 
-    fig_obj = go.Figure()
+@fragmento("fragmento_tabela_redacao")
+def tabela_redacao(df_reg_red, cols_part_red: list, cols_notas_red: list):
+    var_red = data.variacoes["redacao"]
+    cols_tabela = [COL_CODIGO, COL_ESCOLA] + cols_part_red + cols_notas_red
+    df_tabela = df_reg_red[cols_tabela].copy()
 
-    # -----------------------------------------------------------
-    # Traços da ESCOLA
-    # -----------------------------------------------------------
-    # Participação (escola)
-    customdata_part_obj = [
-        [part_obj.iloc[i], var_part_obj[i]] for i in range(len(part_obj))
-    ]
-    fig_obj.add_trace(
-        go.Scatter(
-            x=etapas_obj,
-            y=part_obj_frac,
-            mode="lines+markers+text",
-            name="Participação da escola",
-            text=[f"{v:.2f}%" if pd.notna(v) else "" for v in part_obj],
-            textposition="top center",
-            marker=dict(color="#FF8C00"),
-            line=dict(color="#FF8C00"),
-            customdata=customdata_part_obj,
-            hovertemplate=(
-                "Etapa: %{x}<br>"
-                "Participação: %{customdata[0]:.2f}%<br>"
-                "Variação: %{customdata[1]:.2f} p.p.<extra></extra>"
-            ),
-        )
+    # 1) participação em fração 0–1 (notas já são numéricas)
+    df_tabela[cols_part_red] = df_tabela[cols_part_red] / 100.0
+
+    # Variações entre etapas: só leitura do que já foi pré-calculado
+    cols_fmt_pct, cols_fmt_dec = cols_part_red, cols_notas_red
+    if st.checkbox("Exibir variações entre etapas", key="variacoes_tabela_red"):
+        var_part_tab  = colunas_variacao(var_red["part"], cols_part_red, df_tabela.index, escala=0.01)
+        var_notas_tab = colunas_variacao(var_red["notas"], cols_notas_red, df_tabela.index)
+        df_tabela = df_tabela.assign(**var_part_tab, **var_notas_tab)
+        cols_fmt_pct = cols_fmt_pct + list(var_part_tab)
+        cols_fmt_dec = cols_fmt_dec + list(var_notas_tab)
+
+    # Posição e percentil das notas na regional e no estado (pré-calculados)
+    cols_fmt_int = []
+    if st.checkbox("Exibir posições e percentis", key="posicoes_tabela_red"):
+        pos_tab = colunas_posicao(data.posicoes["redacao"]["notas"], cols_notas_red, df_tabela.index)
+        df_tabela = df_tabela.assign(**pos_tab)
+        cols_fmt_int = list(pos_tab)
+
+    # 2) formatação por coluna no navegador, mantendo o tipo float
+    mostrar_tabela(
+        "redacao",
+        df_tabela,
+        config_numerico(percentuais=cols_fmt_pct, decimais=cols_fmt_dec, inteiros=cols_fmt_int),
     )
 
-    # Acertos (escola)
-    customdata_acertos_obj = [
-        [acertos_obj.iloc[i], var_acertos_obj[i]] for i in range(len(acertos_obj))
-    ]
-    fig_obj.add_trace(
-        go.Scatter(
-            x=etapas_obj,
-            y=acertos_obj_frac,
-            mode="lines+markers+text",
-            name="Média da escola",
-            text=[f"{v:.2f}%" if pd.notna(v) else "" for v in acertos_obj],
-            textposition="top center",
-            marker=dict(color="#000000"),
-            line=dict(color="#000000"),
-            customdata=customdata_acertos_obj,
-            hovertemplate=(
-                "Etapa: %{x}<br>"
-                "Acertos: %{customdata[0]:.2f}%<br>"
-                "Variação: %{customdata[1]:.2f} p.p.<extra></extra>"
-            ),
-        )
-    )
 
-    # -----------------------------------------------------------
-    # Traços da REGIONAL (linha onde Escola ≈ nome da regional)
-    # -----------------------------------------------------------
-    mask_regional_obj = (
-        df_reg_obj[COL_ESCOLA]
-        .astype(str)
-        .str.strip()
-        .str.upper()
-        == reg_norm
-    )
-    df_regional_row_obj = df_reg_obj[mask_regional_obj].copy()
 
-    if not df_regional_row_obj.empty:
-        part_obj_reg = serie_para_float(
-            df_regional_row_obj[COL_PART_OBJ].iloc[0], eh_percentual=True
+@fragmento("fragmento_tabela_objetivas")
+def tabela_objetivas(df_reg_obj, cols_part_obj: list, cols_acertos_obj: list):
+    cols_tabela_obj = [COL_CODIGO, COL_ESCOLA] + cols_part_obj + cols_acertos_obj
+    df_tabela_obj = df_reg_obj[cols_tabela_obj].copy()
+
+    cols_pct_obj = cols_part_obj + cols_acertos_obj
+    df_tabela_obj[cols_pct_obj] = df_tabela_obj[cols_pct_obj] / 100.0
+
+    # Variações entre etapas: só leitura do que já foi pré-calculado
+    var_obj = data.variacoes["objetivas"]
+    if st.checkbox("Exibir variações entre etapas", key="variacoes_tabela_obj"):
+        var_tab_obj = (
+            colunas_variacao(var_obj["part"], cols_part_obj, df_tabela_obj.index, escala=0.01) |
+            colunas_variacao(var_obj["acertos"], cols_acertos_obj, df_tabela_obj.index, escala=0.01)
         )
-        acertos_obj_reg = serie_para_float(
-            df_regional_row_obj[COL_ACERTOS_OBJ].iloc[0], eh_percentual=True
+        df_tabela_obj = df_tabela_obj.assign(**var_tab_obj)
+        cols_pct_obj = cols_pct_obj + list(var_tab_obj)
+
+    # Posição e percentil dos acertos na regional e no estado
+    cols_int_obj = []
+    if st.checkbox("Exibir posições e percentis", key="posicoes_tabela_obj"):
+        pos_tab_obj = colunas_posicao(
+            data.posicoes["objetivas"]["acertos"], cols_acertos_obj, df_tabela_obj.index
         )
+        df_tabela_obj = df_tabela_obj.assign(**pos_tab_obj)
+        cols_int_obj = list(pos_tab_obj)
 
-        part_obj_reg_frac    = part_obj_reg / 100.0
-        acertos_obj_reg_frac = acertos_obj_reg / 100.0
-
-        # Participação (Regional) – linha pontilhada laranja
-        fig_obj.add_trace(
-            go.Scatter(
-                x=etapas_obj,
-                y=part_obj_reg_frac,
-                mode="lines+markers",
-                marker=dict(color="#FF8C00"),
-                name="Participação da regional",
-                line=dict(color="#FF8C00", dash="dot"),
-                hovertemplate=(
-                    "Etapa: %{x}<br>"
-                    "Participação: %{y:.2%}<extra></extra>"
-                ),
-            )
-        )
+    mostrar_tabela(
+        "objetivas",
+        df_tabela_obj,
+        config_numerico(percentuais=cols_pct_obj, inteiros=cols_int_obj),
+    )
 
-        # Acertos (Regional) – linha pontilhada preta
-        fig_obj.add_trace(
-            go.Scatter(
-                x=etapas_obj,
-                y=acertos_obj_reg_frac,
-                mode="lines+markers",
-                name="Média da regional",
-                marker=dict(color="#000000"),
-                line=dict(color="#000000", dash="dot"),
-                hovertemplate=(
-                    "Etapa: %{x}<br>"
-                    "Média da regional: %{y:.2%}<extra></extra>"
-                ),
-            )
-        )
 
-    # Layout do gráfico
-    fig_obj.update_layout(
-        title=dict(
-            text=f"Desempenhos nas Provas Objetivas: {escola_escolhida}",
-            font=dict(size=26)
-        ),
-        font=dict(size=16),
-        height=800,
-        legend=dict(
-            font=dict(size=16)
-        ),
-        yaxis=dict(
-            title="",
-            range=[-0.2, 1.2],
-            showticklabels=False,
-        ),
-        xaxis=dict(
-            tickfont=dict(size=16)
-        ),
-        hoverlabel=dict(font_size=18),
+
+@fragmento("fragmento_escola_participacao")
+def painel_escola_participacao(df_part_reg, escolas_reg: list):
+    st.markdown(
+        "<div style='font-size:22px; margin-bottom:10px;'>Selecione a Escola:</div>",
+        unsafe_allow_html=True
+    )
+    escola_escolhida = st.selectbox(
+        "Escola",
+        escolas_reg,
+        key="escola_dropdown_part",
+        label_visibility="collapsed",
     )
 
-    st.plotly_chart(fig_obj, use_container_width=True)
+    # Filtra a escola escolhida
+    if not (df_part_reg[COL_ESCOLA] == escola_escolhida).any():
+        st.warning("Não há registros de participação para a escola selecionada.")
+    else:
+        mostrar_figura("participacao", escola_escolhida)
+
+
+
+
+# ===============================================================
+# 5) ABA: Desempenhos em Redação
+# ===============================================================
+if aba == "Desempenhos em Redação":
+    # Filtra regionais e escolas válidas
+    if COL_REGIONAL not in df_redacao.columns:
+        st.error(f"A aba Dados_Redação não possui a coluna '{COL_REGIONAL}'.")
+        st.stop()
+
+    # Etapas descobertas nos cabeçalhos ("<etapa>: Participação (%)" / "<etapa>: Nota")
+    cols_part_red = data.colunas("redacao", "part")
+    cols_notas_red = data.colunas("redacao", "notas")
+    if not cols_part_red:
+        st.error("Nenhuma etapa com participação e nota encontrada em Dados_Redação.")
+        st.stop()
+
+    df_reg_red, validas_red = filtrar_escolas_validas("redacao")
+
+    if validas_red.linhas.empty:
+        st.warning("Nenhuma escola desta regional possui todos os dados de redação completos.")
+        st.stop()
+
+    # Escolha de escola + busca (apenas escolas sem faltantes,
+    # já sem a linha da regional) e gráfico
+    painel_escola("redacao", validas_red, ["notas", "part"], "red")
+
+    # Tabela da regional (Redação)
+    st.subheader("Participações e notas de redação da regional selecionada")
+    tabela_redacao(df_reg_red, cols_part_red, cols_notas_red)
+
+
+
+
+# ===============================================================
+# 6) ABA: Desempenhos nas Provas Objetivas
+# ===============================================================
+elif aba == "Desempenhos nas Provas Objetivas":
+    # Conferência das colunas
+    if COL_REGIONAL not in df_objetivas.columns:
+        st.error(f"A aba Dados_Objetivas não possui a coluna '{COL_REGIONAL}'.")
+        st.stop()
+
+    # Etapas descobertas nos cabeçalhos ("Objetivas - <etapa>: ...")
+    cols_part_obj = data.colunas("objetivas", "part")
+    cols_acertos_obj = data.colunas("objetivas", "acertos")
+    if not cols_part_obj:
+        st.error("Nenhuma etapa com participação e acertos encontrada em Dados_Objetivas.")
+        st.stop()
+
+    # Filtra linhas da regional e separa válidas (sem NaN nas colunas usadas)
+    df_reg_obj, validas_obj = filtrar_escolas_validas("objetivas")
+
+    if validas_obj.linhas.empty:
+        st.warning("Nenhuma escola desta regional possui todos os dados de objetivas completos.")
+        st.stop()
+
+    # Se por algum motivo só existir a linha da regional, evita erro
+    if not validas_obj.nomes:
+        st.warning("Para esta regional só há a linha-resumo; não há escolas individuais com dados completos.")
+        st.stop()
+
+    # Dropdown + busca + gráfico
+    painel_escola("objetivas", validas_obj, ["acertos", "part"], "obj")
 
     # -----------------------------------------------------------
     # Tabela da regional (Objetivas) com colunas numéricas
     # -----------------------------------------------------------
     st.subheader("Participações e acertos das provas objetivas da regional selecionada")
-    cols_tabela_obj = [COL_CODIGO, COL_ESCOLA] + COL_PART_OBJ + COL_ACERTOS_OBJ
-    df_tabela_obj = df_reg_obj[cols_tabela_obj].copy()
-
-    for c in COL_PART_OBJ + COL_ACERTOS_OBJ:
-        df_tabela_obj[c] = serie_para_float(df_tabela_obj[c], eh_percentual=True) / 100.0
-
-    styler_obj = df_tabela_obj.style.format(
-        {c: fmt_percent_br for c in COL_PART_OBJ + COL_ACERTOS_OBJ}
-    )
-
-    st.dataframe(styler_obj, use_container_width=True, hide_index=True)
+    tabela_objetivas(df_reg_obj, cols_part_obj, cols_acertos_obj)
 
 
 
@@ -742,145 +701,33 @@ elif aba == "Tempos e Volumes de Participação nas Aplicações":
         st.error(f"A aba Dados_Participação não possui a coluna '{COL_REGIONAL}'.")
         st.stop()
 
-    # Filtra pela regional escolhida (inclui escolas + linha de total da regional)
-    df_part_reg_all = df_part[df_part[COL_REGIONAL] == regional_escolhida].copy()
+    # Partição da regional escolhida (escolas + linha de total da regional)
+    particao_part = data.particao("participacao", regional_escolhida)
+    df_part_reg_all = particao_part.todas
 
     if df_part_reg_all.empty:
         st.warning("Não há registros de tempos/volumes de participação para esta regional.")
     else:
-        # Colunas numéricas: de D até I  → índices 3 a 8 (0-based)
-        cols_num_part = df_part_reg_all.columns[3:9]
-
-        # Converter todas as linhas (escolas + regional) para número inteiro
-        for c in cols_num_part:
-            df_part_reg_all[c] = serie_para_float(
-                df_part_reg_all[c], eh_percentual=False
-            ).round()
-
-        # Separa a linha de TOTAL da regional (Escola ≈ nome da regional)
-        reg_norm = regional_escolhida.strip().upper()
-        mask_regional = (
-            df_part_reg_all[COL_ESCOLA]
-            .astype(str)
-            .str.strip()
-            .str.upper()
-            == reg_norm
-        )
+        # "Número de Participantes: <etapa>", já convertidas para número
+        # inteiro na normalização
+        cols_num_part = data.colunas("participacao", "participantes")
 
-        df_regional_tot = df_part_reg_all[mask_regional].copy()
-        # df_part_reg: só escolas (sem a linha de total)
-        df_part_reg = df_part_reg_all[~mask_regional].copy()
-
-        # Valores da regional por avaliação (para aparecer no hover)
-        if not df_regional_tot.empty:
-            linha_reg = df_regional_tot.iloc[0]
-            reg_values = [linha_reg[c] for c in cols_num_part]
-        else:
-            # se não houver linha de regional, preenche com None
-            reg_values = [None] * len(cols_num_part)
+        # df_part_reg: só escolas (sem a linha de total da regional)
+        df_part_reg = particao_part.escolas
 
         if df_part_reg.empty:
             st.warning("Não há escolas individuais com dados nesta regional.")
             st.stop()
 
-        # Dropdown de escolas da regional (já sem a linha de total)
+        # Dropdown de escolas da regional (já sem a linha de total) e gráfico
         escolas_reg = sorted(df_part_reg[COL_ESCOLA].dropna().unique())
-
-        st.markdown(
-            "<div style='font-size:22px; margin-bottom:10px;'>Selecione a Escola:</div>",
-            unsafe_allow_html=True
-        )
-        escola_escolhida = st.selectbox(
-            "Escola",
-            escolas_reg,
-            key="escola_dropdown_part",
-            label_visibility="collapsed",
-        )
-
-        # Filtra a escola escolhida
-        df_escola_part = df_part_reg[df_part_reg[COL_ESCOLA] == escola_escolhida].copy()
-
-        if df_escola_part.empty:
-            st.warning("Não há registros de participação para a escola selecionada.")
-        else:
-            # Considera a primeira linha da escola
-            linha = df_escola_part.iloc[0]
-            x_labels = ["1º Simulado", "1º Teste de Redação", "2º Teste de Redação", "2º Simulado", "3º Teste de Redação", "4º Teste de Redação"]
-            y_values = [linha[c] for c in cols_num_part]
-
-            # Monta hover com variação abs., variação % e participantes da regional
-            hover_texts = []
-            prev_val = None
-            for i, (label, val) in enumerate(zip(x_labels, y_values)):
-                reg_val = reg_values[i] if i < len(reg_values) else None
-                reg_str = fmt_int(reg_val) if reg_val is not None and not pd.isna(reg_val) else "-"
-
-                if pd.isna(val):
-                    hover_texts.append(f"Participantes (Regional): {reg_str}")
-                elif prev_val is None or pd.isna(prev_val):
-                    # primeiro ponto: só o valor + participantes da regional
-                    hover_texts.append(
-                        "<br>Participantes (Regional): "
-                        + reg_str
-                    )
-                else:
-                    var_abs = val - prev_val
-                    if prev_val != 0 and not pd.isna(prev_val):
-                        var_pct = (var_abs / prev_val) * 100
-                        var_pct_str = f"{var_pct:.2f}%".replace(".", ",")
-                    else:
-                        var_pct_str = "-"
-                    hover_texts.append(
-                        "<br>Variação Absoluta: "
-                        + fmt_int(var_abs)
-                        + "<br>Variação Relativa: "
-                        + var_pct_str
-                        + "<br>Participantes (Regional): "
-                        + reg_str
-                    )
-                prev_val = val
-
-            # Gráfico de linhas
-            fig_part = go.Figure()
-            fig_part.add_trace(
-                go.Scatter(
-                    x=x_labels,
-                    y=y_values,
-                    mode="lines+markers+text",
-                    name="Valores (Escola)",
-                    text=[fmt_int(v) if not pd.isna(v) else "" for v in y_values],
-                    textposition="top center",
-                    hoverinfo="text",
-                    hovertext=hover_texts,
-                )
-            )
-
-            fig_part.update_layout(
-                title=dict(
-                    text=f"Tempos e Volumes de Participação: {escola_escolhida}",
-                    font=dict(size=24)
-                ),
-                font=dict(size=16),
-                height=600,
-                yaxis=dict(
-                    title="",
-                    showticklabels=False,
-                ),
-                xaxis=dict(
-                    tickfont=dict(size=16)
-                ),
-                hoverlabel=dict(font_size=18),
-            )
-
-            st.plotly_chart(fig_part, use_container_width=True)
+        painel_escola_participacao(df_part_reg, escolas_reg)
 
         # Tabela completa da regional (APENAS ESCOLAS, sem total da regional)
-        styler_part = df_part_reg.style.format(
-            {c: fmt_int for c in cols_num_part}
-        )
-
         st.subheader("Tempos e Volumes de Participação nas Aplicações")
-        st.dataframe(styler_part, use_container_width=True, hide_index=True)
+        tabela_paginada(
+            "participacao", df_part_reg, cols_num_part, config_numerico(decimais=cols_num_part)
+        )
 
 
 
@@ -893,41 +740,68 @@ elif aba == "Detalhamento de Acessos":
         st.error(f"A aba Dados_Acesso_Detalhado não possui a coluna '{COL_REGIONAL}'.")
         st.stop()
 
-    # Filtra pela regional escolhida (inclui escolas + total da regional)
-    df_acessos_reg_all = df_acessos[df_acessos[COL_REGIONAL] == regional_escolhida].copy()
+    # Partição da regional escolhida (inclui escolas + total da regional)
+    particao_acessos = data.particao("acessos", regional_escolhida)
 
-    if df_acessos_reg_all.empty:
+    if particao_acessos.todas.empty:
         st.warning("Não há registros de acessos detalhados para esta regional.")
     else:
-        # Remove a linha de total da regional (Escola ≈ nome da regional)
-        reg_norm = regional_escolhida.strip().upper()
-        mask_regional = (
-            df_acessos_reg_all[COL_ESCOLA]
-            .astype(str)
-            .str.strip()
-            .str.upper()
-            == reg_norm
-        )
-        df_acessos_reg = df_acessos_reg_all[~mask_regional].copy()
+        # Apenas escolas (sem a linha de total da regional)
+        df_acessos_reg = particao_acessos.escolas
 
         if df_acessos_reg.empty:
             st.warning("Não há escolas individuais com registros de acessos nesta regional.")
         else:
-            # Colunas numéricas: de C até J → índices 2 a 9 (0-based)
-            cols_num_acessos = df_acessos_reg.columns[2:10]
+            # Colunas percentuais ("% Alunos c/Acesso", ...)
+            cols_num_acessos = colunas_numericas("acessos", df_acessos_reg)[0]
 
-            for c in cols_num_acessos:
-                df_acessos_reg[c] = (
-                    serie_para_float(df_acessos_reg[c], eh_percentual=True) / 100.0
-                )
+            st.subheader("Detalhamento de Acessos")
 
-            styler_acessos = df_acessos_reg.style.format(
-                {c: fmt_percent_br for c in cols_num_acessos}
+            # fração 0–1 só nas linhas da página (a partição em cache não é alterada)
+            tabela_paginada(
+                "acessos", df_acessos_reg, cols_num_acessos,
+                config_numerico(percentuais=cols_num_acessos),
+                converter=lambda df_: df_.assign(**{c: df_[c] / 100.0 for c in cols_num_acessos}),
             )
 
-            st.subheader("Detalhamento de Acessos")
 
-            st.dataframe(styler_acessos, use_container_width=True, hide_index=True)
+
+# ===============================================================
+# 9) ABA: Qualidade dos dados (administração)
+# ===============================================================
+elif aba == ABA_QUALIDADE:
+    st.subheader("Qualidade dos dados da planilha")
+    relatorio = chamar_em_cache("relatorio_qualidade", relatorio_qualidade, data.versao, data)
+
+    so_regional = st.checkbox("Só a regional selecionada", key="qualidade_so_regional")
+    tabelas = {}
+    for nome in TITULOS_QUALIDADE:
+        tabela = getattr(relatorio, nome)
+        if so_regional:
+            tabela = tabela[tabela["regional"] == regional_escolhida]
+        tabelas[nome] = tabela
+
+    for coluna, (nome, titulo) in zip(st.columns(len(TITULOS_QUALIDADE)), TITULOS_QUALIDADE.items()):
+        coluna.metric(titulo, len(tabelas[nome]))
+
+    st.caption(
+        "Resumos divergentes: linha-resumo da regional diferente do agregado das "
+        "escolas em mais de 2% (soma dos participantes; notas de redação ponderadas "
+        "pelos participantes; participação de redação pelo total de participantes; "
+        "média simples nas demais colunas)."
+    )
+    for nome, titulo in TITULOS_QUALIDADE.items():
+        with st.expander(f"{titulo} ({len(tabelas[nome])})"):
+            if tabelas[nome].empty:
+                st.caption("Nenhum problema encontrado.")
+            else:
+                st.dataframe(tabelas[nome], hide_index=True, use_container_width=True)
 
 
 
+# ===============================================================
+# 10) Fim do rerun: registro estruturado dos tempos
+# ===============================================================
+st.session_state["metricas_ultimo_rerun"] = finalizar_rerun(
+    aba=aba, regional=regional_escolhida, versao=data.versao[:12]
+)
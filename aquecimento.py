@@ -0,0 +1,92 @@
+# aquecimento.py
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dados import COL_ESCOLA, SERIES_COMPLETUDE, ConjuntoDados
+from instrumentacao import registrar_tempo
+
+logger = logging.getLogger(__name__)
+
+
+# ===============================================================
+# Aquecimento dos caches (PAINEL_AQUECIMENTO=1)
+# ===============================================================
+# Ao subir e a cada recarga do Excel, as figuras de todas as escolas de
+# todas as regionais são montadas em segundo plano, para que a primeira
+# visita a uma regional/aba já encontre tudo em cache.
+AQUECIMENTO_ATIVO = os.environ.get("PAINEL_AQUECIMENTO") == "1"
+
+# Abas com gráfico por escola (Acessos só tem tabela, servida paginada)
+ABAS_FIGURA = ("redacao", "objetivas", "participacao")
+
+
+def escolas_da_aba(dados: ConjuntoDados, chave: str, regional: str) -> list:
+    """
+    Escolas do dropdown da aba, na mesma ordem do painel.
+    """
+    if chave in SERIES_COMPLETUDE:
+        return dados.escolas_validas(chave, regional).nomes
+    return sorted(dados.particao(chave, regional).escolas[COL_ESCOLA].dropna().astype(str).unique())
+
+
+def tarefas_aquecimento(dados: ConjuntoDados) -> list:
+    """
+    (aba, regional, escola) de todas as figuras. Primeiro a escola que cada
+    regional mostra ao ser aberta (a primeira do dropdown), depois as demais.
+    """
+    primeiras, demais = [], []
+    for chave in ABAS_FIGURA:
+        for regional in dados.indice[chave]:
+            escolas = escolas_da_aba(dados, chave, regional)
+            if escolas:
+                primeiras.append((chave, regional, escolas[0]))
+                demais.extend((chave, regional, escola) for escola in escolas[1:])
+    return primeiras + demais
+
+
+def limite_cache_figuras(dados: ConjuntoDados, particoes: int) -> int:
+    """
+    Entradas do cache de figuras para caber o aquecimento de `particoes`
+    planilhas carregadas ao mesmo tempo, mais uma versão de folga para a
+    recarga do Excel (a versão anterior só sai depois, pelo LRU).
+    """
+    return len(tarefas_aquecimento(dados)) * (particoes + 1)
+
+
+class Aquecedor:
+    """
+    Executa `montar(chave, regional, escola, dados)` para todas as figuras
+    de cada versão recebida em aquecer(). Uma única thread de fundo: versões
+    novas entram na fila, e cada versão é aquecida uma vez por processo.
+    """
+
+    def __init__(self, montar):
+        self.montar = montar
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="aquecimento")
+        self._versoes = set()
+
+    def aquecer(self, dados: ConjuntoDados) -> None:
+        if dados.versao in self._versoes:
+            return
+        self._versoes.add(dados.versao)
+        self._executor.submit(self._executar, dados)
+
+    def _executar(self, dados: ConjuntoDados) -> None:
+        inicio = time.perf_counter()
+        tarefas = tarefas_aquecimento(dados)
+        falhas = 0
+        for chave, regional, escola in tarefas:
+            try:
+                self.montar(chave, regional, escola, dados)
+            except Exception:
+                falhas += 1
+                logger.exception("Aquecimento: falha em %s/%s/%s", chave, regional, escola)
+
+        total = time.perf_counter() - inicio
+        registrar_tempo("aquecimento", total)
+        logger.info(
+            "Aquecimento da versão %s: %d figuras em %.1fs (%d falhas)",
+            dados.versao[:12], len(tarefas), total, falhas,
+        )
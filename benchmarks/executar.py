@@ -0,0 +1,251 @@
+# benchmarks/executar.py
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from dados import (  # noqa: E402
+    ABAS,
+    ConjuntoDados,
+    carregar_dados,
+    ler_planilhas,
+    serie_para_float,
+)
+from gerar_planilha import gerar_planilha  # noqa: E402
+from graficos import FIGURAS  # noqa: E402
+from metricas import calcular_variacoes, colunas_variacao  # noqa: E402
+
+# Planilhas sintéticas geradas ficam aqui entre execuções
+DIR_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+# Figuras montadas por medição (as primeiras escolas válidas de cada aba)
+N_FIGURAS = 20
+
+
+# ===============================================================
+# Cronometragem
+# ===============================================================
+def cronometrar(funcao, repeticoes: int, preparar=None) -> list:
+    """
+    Tempos (s) de `repeticoes` execuções de funcao(); `preparar`, se
+    houver, roda antes de cada uma, fora da medição.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        argumento = preparar() if preparar else None
+        inicio = time.perf_counter()
+        funcao() if preparar is None else funcao(argumento)
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def resultado(escala, etapa: str, tempos: list, **extra) -> dict:
+    return {
+        "escala": escala,
+        "etapa": etapa,
+        "repeticoes": len(tempos),
+        "mediana_s": statistics.median(tempos),
+        "min_s": min(tempos),
+        "max_s": max(tempos),
+        **extra,
+    }
+
+
+# ===============================================================
+# Medições (uma planilha, uma escala)
+# ===============================================================
+def medir_escala(planilha: str, escala, repeticoes: int, repeticoes_excel: int) -> list:
+    resultados = []
+    dir_snapshot = tempfile.mkdtemp(prefix="bench-snapshot-")
+    try:
+        # load_data sem snapshot: Excel -> normalização -> snapshot
+        def sem_snapshot():
+            shutil.rmtree(dir_snapshot, ignore_errors=True)
+
+        tempos = cronometrar(
+            lambda _: carregar_dados(planilha, dir_snapshot), repeticoes_excel, preparar=sem_snapshot
+        )
+        resultados.append(resultado(escala, "carregar_excel", tempos))
+
+        # só a leitura do Excel: em sequência x um processo por aba
+        tempos = cronometrar(lambda: ler_planilhas(planilha, paralelo=False), repeticoes_excel)
+        resultados.append(resultado(escala, "ler_excel_sequencial", tempos))
+        tempos = cronometrar(
+            lambda: ler_planilhas(planilha, paralelo=True, processos=len(ABAS)), repeticoes_excel
+        )
+        resultados.append(resultado(escala, "ler_excel_paralelo", tempos, processos=len(ABAS)))
+
+        # load_data com snapshot (caminho de todo início de processo)
+        tempos = cronometrar(lambda: carregar_dados(planilha, dir_snapshot), repeticoes)
+        resultados.append(resultado(escala, "carregar_snapshot", tempos))
+
+        dados = carregar_dados(planilha, dir_snapshot)
+        linhas = {chave: len(df_) for chave, df_ in dados.abas.items()}
+
+        # serie_para_float sobre as colunas de texto cruas da aba de redação
+        brutas = ler_planilhas(planilha, paralelo=False)[0]["redacao"]
+        cols_part = dados.colunas("redacao", "part")
+        tempos = cronometrar(
+            lambda: [serie_para_float(brutas[c], eh_percentual=True) for c in cols_part], repeticoes
+        )
+        resultados.append(resultado(escala, "serie_para_float", tempos, linhas=len(brutas)))
+
+        # estruturas derivadas de uma versão nova (índice, válidas, variações...)
+        tempos = cronometrar(
+            lambda d: d.preparar(), repeticoes,
+            preparar=lambda: ConjuntoDados(dados.versao, dados.abas),
+        )
+        resultados.append(resultado(escala, "preparar", tempos, linhas=linhas))
+
+        tempos = cronometrar(
+            lambda: [
+                calcular_variacoes(dados[chave], cols)
+                for chave in ("redacao", "objetivas")
+                for cols in dados.etapas[chave].series.values()
+            ],
+            repeticoes,
+        )
+        resultados.append(resultado(escala, "variacoes", tempos))
+
+        dados.preparar()
+        regionais = list(dados.indice["redacao"])
+
+        # o que cada rerun faz por regional: partição + escolas válidas
+        tempos = cronometrar(
+            lambda: [
+                (dados.particao(chave, r), dados.escolas_validas(chave, r))
+                for r in regionais
+                for chave in ("redacao", "objetivas")
+            ],
+            repeticoes,
+        )
+        resultados.append(resultado(escala, "filtrar_regionais", tempos, regionais=len(regionais)))
+
+        for chave, montar in FIGURAS.items():
+            if chave == "participacao":
+                escolas = [
+                    (r, e) for r in regionais
+                    for e in dados.particao(chave, r).escolas["Escola"].astype(str)
+                ][:N_FIGURAS]
+            else:
+                escolas = [
+                    (r, e) for r in regionais for e in dados.escolas_validas(chave, r).nomes
+                ][:N_FIGURAS]
+            tempos = cronometrar(
+                lambda: [montar(dados, r, e).to_json() for r, e in escolas], max(1, repeticoes // 2)
+            )
+            resultados.append(resultado(escala, f"figura_{chave}", tempos, figuras=len(escolas)))
+
+        # tabela de redação como no app (frações + variações) serializada
+        # em Arrow, o formato que o st.dataframe envia ao navegador
+        def tabela_redacao():
+            cols_part = dados.colunas("redacao", "part")
+            cols_notas = dados.colunas("redacao", "notas")
+            var_red = dados.variacoes["redacao"]
+            for r in regionais:
+                df_reg = dados.particao("redacao", r).todas
+                df_tab = df_reg[["Código Interno", "Escola"] + cols_part + cols_notas].copy()
+                df_tab[cols_part] = df_tab[cols_part] / 100.0
+                df_tab = df_tab.assign(
+                    **colunas_variacao(var_red["part"], cols_part, df_tab.index, escala=0.01),
+                    **colunas_variacao(var_red["notas"], cols_notas, df_tab.index),
+                )
+                pa.Table.from_pandas(df_tab, preserve_index=False)
+
+        tempos = cronometrar(tabela_redacao, repeticoes)
+        resultados.append(resultado(escala, "tabelas_redacao", tempos, regionais=len(regionais)))
+    finally:
+        shutil.rmtree(dir_snapshot, ignore_errors=True)
+    return resultados
+
+
+# ===============================================================
+# Linha de comando
+# ===============================================================
+def commit_atual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def comparar(anterior: dict, atual: dict) -> None:
+    """
+    Razão atual/anterior das medianas (< 1: ficou mais rápido).
+    """
+    antes = {(r["escala"], r["etapa"]): r["mediana_s"] for r in anterior["resultados"]}
+    print(f"{'escala':>7} {'etapa':<20} {'antes (ms)':>12} {'agora (ms)':>12} {'razão':>7}")
+    for r in atual["resultados"]:
+        chave = (r["escala"], r["etapa"])
+        if chave in antes:
+            print(f"{r['escala']:>7} {r['etapa']:<20} {antes[chave] * 1000:>12.2f} "
+                  f"{r['mediana_s'] * 1000:>12.2f} {r['mediana_s'] / antes[chave]:>7.2f}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Mede carga, filtro, variações, figuras e tabelas em planilhas sintéticas"
+    )
+    parser.add_argument("--escala", type=float, nargs="+", default=[1, 10],
+                        help="escalas da planilha sintética (1 = tamanho real; ex.: 1 10 100)")
+    parser.add_argument("--planilha", help="mede esta planilha em vez das sintéticas")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--repeticoes-excel", type=int, default=1,
+                        help="repetições da leitura do Excel (lenta nas escalas grandes)")
+    parser.add_argument("--saida", help="grava os resultados em JSON neste arquivo")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args(argv)
+
+    if args.planilha:
+        planilhas = [(args.planilha, "real")]
+    else:
+        planilhas = []
+        for escala in args.escala:
+            caminho = os.path.join(DIR_CACHE, f"sintetica-x{escala:g}.xlsx")
+            if not os.path.exists(caminho):
+                print(f"gerando planilha sintética x{escala:g}...", file=sys.stderr)
+                gerar_planilha(caminho, escala)
+            planilhas.append((caminho, int(escala) if escala == int(escala) else escala))
+
+    resultados = []
+    for caminho, escala in planilhas:
+        print(f"medindo {os.path.basename(caminho)}...", file=sys.stderr)
+        resultados.extend(medir_escala(caminho, escala, args.repeticoes, args.repeticoes_excel))
+
+    saida = {
+        "commit": commit_atual(),
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "cpus": os.cpu_count(),
+        "resultados": resultados,
+    }
+    texto = json.dumps(saida, ensure_ascii=False, indent=1)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(json.load(f), saida)
+
+
+if __name__ == "__main__":
+    main()
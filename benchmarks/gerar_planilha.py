@@ -0,0 +1,139 @@
+# benchmarks/gerar_planilha.py
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dados import ABAS, COL_CODIGO, COL_ESCOLA, COL_REGIONAL  # noqa: E402
+
+
+# ===============================================================
+# Planilha sintética com o mesmo layout de Dados_RJ.xlsx
+# ===============================================================
+# Proporções da planilha real: 14 regionais com ~80 escolas cada
+N_REGIONAIS = 14
+ESCOLAS_POR_REGIONAL = 80
+
+ETAPAS_REDACAO = [
+    "1º Simulado",
+    "1º Teste de Redação",
+    "2º Teste de Redação",
+    "2º Simulado",
+    "3º Teste de Redação",
+    "4º Teste de Redação",
+]
+ETAPAS_OBJETIVAS = ["1º Simulado", "2º Simulado"]
+COLS_ACESSOS = [
+    "% Alunos c/Acesso",
+    "% Prof. com Acesso",
+    "% Gestores com Acesso",
+    "% Utiliza Livros",
+    "% Utiliza Aulas",
+    "% Utiliza Trilha",
+    "% Utiliza Treino Redação",
+    "% Utiliza Tira-dúvidas",
+]
+
+# fração de células vazias ("-") nas métricas
+FRACAO_FALTANTES = 0.03
+
+
+def _texto_br(valores: np.ndarray, sufixo: str = "", casas: int = 2) -> pd.Series:
+    """
+    Números no formato da planilha: 85.12 -> '85,12%'; 1202 -> '1.202'.
+    """
+    s = pd.Series(valores).map(lambda v: f"{v:,.{casas}f}")
+    s = s.str.replace(",", "_", regex=False).str.replace(".", ",", regex=False)
+    return s.str.replace("_", ".", regex=False) + sufixo
+
+
+def _com_faltantes(s: pd.Series, rng) -> pd.Series:
+    return s.mask(rng.random(len(s)) < FRACAO_FALTANTES, "-")
+
+
+def gerar_abas(escala: float = 1, semente: int = 0) -> dict:
+    """
+    DataFrames (tudo texto) das abas do painel, com escala x o número de
+    escolas da planilha real e uma linha-resumo por regional.
+    """
+    rng = np.random.default_rng(semente)
+    n_por_regional = max(1, int(round(ESCOLAS_POR_REGIONAL * escala)))
+
+    regionais = [f"REGIONAL SINTETICA {i + 1:02d}" for i in range(N_REGIONAIS)]
+    regional = np.repeat(regionais, n_por_regional)
+    codigo = np.arange(10000, 10000 + len(regional)).astype(str)
+    escola = np.array([f"CE ESCOLA SINTETICA {c}" for c in codigo])
+
+    # linha-resumo de cada regional no fim do bloco dela
+    regional = np.concatenate([regional, regionais])
+    codigo = np.concatenate([codigo, [""] * N_REGIONAIS])
+    escola = np.concatenate([escola, regionais])
+    ordem = np.argsort(regional, kind="stable")
+    regional, codigo, escola = regional[ordem], codigo[ordem], escola[ordem]
+    n = len(regional)
+
+    def pct():
+        return _com_faltantes(_texto_br(rng.uniform(20, 100, n), "%"), rng)
+
+    chaves = pd.DataFrame({COL_CODIGO: codigo, COL_REGIONAL: regional, COL_ESCOLA: escola})
+
+    redacao = chaves.copy()
+    for etapa in ETAPAS_REDACAO:
+        redacao[f"{etapa}: Participação (%)"] = pct()
+        redacao[f"{etapa}: Nota"] = _com_faltantes(_texto_br(rng.uniform(100, 900, n)), rng)
+
+    objetivas = chaves.copy()
+    for etapa in ETAPAS_OBJETIVAS:
+        objetivas[f"Objetivas - {etapa}: Participação (%)"] = pct()
+        objetivas[f"Objetivas - {etapa}: Acertos (%)"] = pct()
+
+    # Participação e acessos: escola com " - <código>" e sem Código Interno
+    escola_cod = np.where(codigo != "", [f"{e} - {c}" for e, c in zip(escola, codigo)], escola)
+    participacao = pd.DataFrame({COL_REGIONAL: regional, COL_ESCOLA: escola_cod})
+    minutos = rng.integers(60, 400, n)
+    participacao["Tempo Médio por Aluno"] = [f"{m // 60:02d}h{m % 60:02d}" for m in minutos]
+    for etapa in ETAPAS_REDACAO:
+        participacao[f"Número de Participantes: {etapa}"] = _com_faltantes(
+            _texto_br(rng.integers(0, 2000, n), casas=0), rng
+        )
+
+    acessos = pd.DataFrame({COL_REGIONAL: regional, COL_ESCOLA: escola_cod})
+    for c in COLS_ACESSOS:
+        acessos[c] = _texto_br(rng.uniform(0, 100, n), "%")
+
+    return {
+        "original": redacao.merge(objetivas, on=[COL_CODIGO, COL_REGIONAL, COL_ESCOLA], how="left"),
+        "redacao": redacao,
+        "objetivas": objetivas,
+        "participacao": participacao,
+        "acessos": acessos,
+    }
+
+
+def gerar_planilha(caminho: str, escala: float = 1, semente: int = 0) -> str:
+    """
+    Grava a planilha sintética (.xlsx) com as abas e nomes do painel.
+    """
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with pd.ExcelWriter(caminho, engine="openpyxl") as writer:
+        for chave, df_ in gerar_abas(escala, semente).items():
+            df_.to_excel(writer, sheet_name=ABAS[chave], index=False)
+    return caminho
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Gera uma planilha sintética no layout do painel")
+    parser.add_argument("saida")
+    parser.add_argument("--escala", type=float, default=1,
+                        help="multiplica o número de escolas (10, 100...)")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args(argv)
+    gerar_planilha(args.saida, args.escala, args.semente)
+
+
+if __name__ == "__main__":
+    main()
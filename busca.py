@@ -0,0 +1,118 @@
+# busca.py
+import re
+import unicodedata
+from typing import NamedTuple
+
+
+# ===============================================================
+# Normalização de texto para a busca
+# ===============================================================
+def dobrar(texto) -> str:
+    """
+    Minúsculas, sem acentos e com espaços simples:
+    'Colégio  Estadual JOÃO' -> 'colegio estadual joao'.
+    """
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(ch for ch in texto if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", texto).strip().lower()
+
+
+def trigramas(texto: str) -> set:
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+# ===============================================================
+# Índice de busca de escolas (trigramas + código interno)
+# ===============================================================
+class ResultadoBusca(NamedTuple):
+    escola: str
+    regional: str
+    codigo: str
+
+
+class IndiceBusca:
+    """
+    Índice de n-gramas (trigramas) sobre os nomes das escolas de todas as
+    regionais, com busca sem acentos e por Código Interno.
+    """
+
+    def __init__(self, entradas):
+        # entradas: iterável de (escola, regional, codigo)
+        self.entradas = [ResultadoBusca(*e) for e in entradas]
+        self.nomes = [dobrar(e.escola) for e in self.entradas]
+
+        self.postings = {}
+        for i, nome in enumerate(self.nomes):
+            for tri in trigramas(nome):
+                self.postings.setdefault(tri, set()).add(i)
+
+        self.por_codigo = {}
+        self.por_regional = {}
+        for i, e in enumerate(self.entradas):
+            self.por_regional.setdefault(e.regional, set()).add(i)
+            codigo = str(e.codigo).strip()
+            if codigo.isdigit():
+                self.por_codigo.setdefault(codigo, []).append(i)
+
+    def _candidatos(self, tokens, regional) -> set:
+        """
+        Entradas que contêm todos os trigramas dos tokens (superconjunto das
+        que contêm os tokens como substring).
+        """
+        candidatos = None if regional is None else self.por_regional.get(regional, set())
+        for token in tokens:
+            for tri in trigramas(token):
+                ids = self.postings.get(tri, set())
+                candidatos = ids if candidatos is None else candidatos & ids
+                if not candidatos:
+                    return set()
+        if candidatos is None:
+            # busca no estado só com tokens curtos (< 3 letras):
+            # não há trigramas para filtrar
+            candidatos = set(range(len(self.entradas)))
+        return candidatos
+
+    def buscar(self, termo: str, regional=None, limite: int = 20) -> list:
+        """
+        Retorna até `limite` escolas ordenadas por relevância:
+        código exato, nome exato, começo do nome, começo de palavra, trecho.
+        Se `regional` for informada, restringe a busca a ela.
+        """
+        termo_dobrado = dobrar(termo)
+        if not termo_dobrado:
+            return []
+
+        pontuados = []
+        if termo_dobrado.isdigit():
+            for i in self.por_codigo.get(termo_dobrado, []):
+                pontuados.append((0, i))
+
+        tokens = termo_dobrado.split(" ")
+        for i in self._candidatos(tokens, regional):
+            nome = self.nomes[i]
+            if not all(t in nome for t in tokens):
+                continue
+            if nome == termo_dobrado:
+                pontos = 1
+            elif nome.startswith(termo_dobrado):
+                pontos = 2
+            elif (" " + termo_dobrado) in (" " + nome):
+                pontos = 3
+            elif termo_dobrado in nome:
+                pontos = 4
+            else:
+                # todos os tokens aparecem, mas fora de ordem
+                pontos = 5
+            pontuados.append((pontos, i))
+
+        vistos = set()
+        resultados = []
+        for pontos, i in sorted(pontuados, key=lambda p: (p[0], self.nomes[p[1]])):
+            e = self.entradas[i]
+            if i in vistos or (regional is not None and e.regional != regional):
+                continue
+            vistos.add(i)
+            resultados.append(e)
+            if len(resultados) >= limite:
+                break
+        return resultados
@@ -0,0 +1,224 @@
+# catalogo.py
+import argparse
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+from dados import (
+    ARQUIVO_DADOS,
+    DIR_PACOTE,
+    DIR_SNAPSHOT,
+    ConjuntoDados,
+    GerenciadorDados,
+    construir_pacote,
+    versao_no_pacote,
+)
+from instrumentacao import contar_cache
+
+logger = logging.getLogger(__name__)
+
+
+# ===============================================================
+# Catálogo de planilhas (uma por ano/ciclo)
+# ===============================================================
+# Arquivo JSON com as planilhas registradas. Sem ele, o painel usa só
+# ARQUIVO_DADOS, como antes.
+ARQUIVO_CATALOGO = os.environ.get("PAINEL_CATALOGO", "catalogo.json")
+
+# Quantas partições (planilhas) ficam carregadas ao mesmo tempo
+MAX_CARREGADAS = int(os.environ.get("PAINEL_MAX_PARTICOES", "2"))
+
+
+class EntradaCatalogo(NamedTuple):
+    ano: str
+    ciclo: str
+    arquivo: str
+
+    @property
+    def rotulo(self) -> str:
+        if not self.ano and not self.ciclo:
+            return os.path.basename(self.arquivo)
+        return " – ".join(p for p in (self.ano, self.ciclo) if p)
+
+
+def ler_catalogo(caminho: str = ARQUIVO_CATALOGO) -> list:
+    """
+    Entradas do catálogo, da mais recente para a mais antiga. Caminhos
+    relativos são resolvidos a partir da pasta do catálogo; planilhas que
+    não existem (nem no pacote pré-montado) são ignoradas, com aviso no log.
+    """
+    if not os.path.exists(caminho):
+        return [EntradaCatalogo("", "", ARQUIVO_DADOS)]
+
+    with open(caminho, encoding="utf-8") as f:
+        registro = json.load(f)
+
+    base = os.path.dirname(caminho)
+    entradas = []
+    for item in registro.get("planilhas", []):
+        arquivo = os.path.normpath(os.path.join(base, item["arquivo"]))
+        if not os.path.exists(arquivo) and versao_no_pacote(arquivo) is None:
+            logger.warning("Planilha do catálogo não encontrada: %s", arquivo)
+            continue
+        entradas.append(EntradaCatalogo(str(item.get("ano", "")), str(item.get("ciclo", "")), arquivo))
+
+    return sorted(entradas, key=lambda e: (e.ano, e.ciclo), reverse=True)
+
+
+def registrar_planilha(ano: str, ciclo: str, arquivo: str, caminho: str = ARQUIVO_CATALOGO) -> None:
+    """
+    Inclui (ou substitui) a planilha de um ano/ciclo no catálogo. O arquivo
+    é gravado à parte e renomeado, para o painel nunca ler um JSON pela metade.
+    """
+    registro = {"planilhas": []}
+    if os.path.exists(caminho):
+        with open(caminho, encoding="utf-8") as f:
+            registro = json.load(f)
+
+    base = os.path.dirname(os.path.abspath(caminho))
+    planilhas = [
+        p for p in registro.get("planilhas", [])
+        if (str(p.get("ano", "")), str(p.get("ciclo", ""))) != (ano, ciclo)
+    ]
+    planilhas.append({
+        "ano": ano,
+        "ciclo": ciclo,
+        "arquivo": os.path.relpath(os.path.abspath(arquivo), base),
+    })
+    registro["planilhas"] = planilhas
+
+    tmp = f"{caminho}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(registro, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, caminho)
+
+
+# ===============================================================
+# Partições carregadas sob demanda
+# ===============================================================
+class Catalogo:
+    """
+    Planilhas registradas e os dados das que estão em uso. Cada planilha é
+    uma partição independente: só é lida (ou aberta do snapshot) quando uma
+    visão pede por ela, e no máximo `max_carregadas` ficam em memória; a
+    menos usada recentemente é descartada quando outra entra.
+    """
+
+    def __init__(self, caminho: str = ARQUIVO_CATALOGO, dir_snapshot: str = DIR_SNAPSHOT,
+                 max_carregadas: int = MAX_CARREGADAS):
+        self.caminho = caminho
+        self.dir_snapshot = dir_snapshot
+        self.max_carregadas = max(1, max_carregadas)
+
+        self._lock = threading.Lock()
+        self._carregando = {}               # entrada -> lock da carga
+        self._carregadas = OrderedDict()    # entrada -> GerenciadorDados (LRU)
+        self._observadores = []
+        self._assinatura = None
+        self._entradas = []
+
+    def entradas(self) -> list:
+        """
+        Entradas atuais do catálogo. O JSON só é relido quando muda.
+        """
+        try:
+            st_ = os.stat(self.caminho)
+            assinatura = (st_.st_mtime_ns, st_.st_size)
+        except OSError:
+            assinatura = None
+
+        with self._lock:
+            if assinatura != self._assinatura or not self._entradas:
+                self._entradas = ler_catalogo(self.caminho)
+                self._assinatura = assinatura
+            return self._entradas
+
+    def gerenciador(self, entrada: EntradaCatalogo) -> GerenciadorDados:
+        """
+        Gerenciador da partição, carregando-a na primeira vez. Sessões que
+        pedem a mesma partição ao mesmo tempo esperam uma única carga.
+        """
+        with self._lock:
+            if entrada in self._carregadas:
+                self._carregadas.move_to_end(entrada)
+                contar_cache("particao", acerto=True)
+                return self._carregadas[entrada]
+            lock_carga = self._carregando.setdefault(entrada, threading.Lock())
+
+        with lock_carga:
+            with self._lock:
+                if entrada in self._carregadas:
+                    contar_cache("particao", acerto=True)
+                    return self._carregadas[entrada]
+
+            contar_cache("particao", acerto=False)
+            gerenciador = GerenciadorDados(entrada.arquivo, self.dir_snapshot)
+            logger.info("Partição %s carregada", entrada.rotulo)
+            for funcao in list(self._observadores):
+                gerenciador.observar(funcao)
+
+            with self._lock:
+                self._carregadas[entrada] = gerenciador
+                self._carregando.pop(entrada, None)
+                while len(self._carregadas) > self.max_carregadas:
+                    antiga, descartado = self._carregadas.popitem(last=False)
+                    # sessões que ainda usam a versão descartada seguem com ela
+                    descartado.parar()
+                    logger.info("Partição %s descartada da memória", antiga.rotulo)
+            return gerenciador
+
+    def dados(self, entrada: EntradaCatalogo) -> ConjuntoDados:
+        return self.gerenciador(entrada).atual()
+
+    def observar(self, funcao) -> None:
+        """
+        Registra funcao(dados) em todas as partições, já carregadas e futuras:
+        é chamada com cada versão carregada ou recarregada.
+        """
+        with self._lock:
+            self._observadores.append(funcao)
+            gerenciadores = list(self._carregadas.values())
+        for gerenciador in gerenciadores:
+            gerenciador.observar(funcao)
+
+
+# ===============================================================
+# Linha de comando: registrar e listar planilhas
+# ===============================================================
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Catálogo de planilhas do painel")
+    parser.add_argument("--catalogo", default=ARQUIVO_CATALOGO)
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_reg = sub.add_parser("registrar", help="inclui a planilha de um ano/ciclo")
+    p_reg.add_argument("ano")
+    p_reg.add_argument("ciclo")
+    p_reg.add_argument("arquivo")
+
+    sub.add_parser("listar", help="mostra as planilhas registradas")
+
+    p_pacote = sub.add_parser(
+        "construir", help="gera o pacote de dados pré-montado com todas as planilhas"
+    )
+    p_pacote.add_argument("--saida", default=DIR_PACOTE)
+
+    args = parser.parse_args(argv)
+    if args.comando == "registrar":
+        if not os.path.exists(args.arquivo):
+            parser.error(f"arquivo não encontrado: {args.arquivo}")
+        registrar_planilha(args.ano, args.ciclo, args.arquivo, args.catalogo)
+    elif args.comando == "construir":
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+        os.makedirs(args.saida, exist_ok=True)
+        arquivos = [e.arquivo for e in ler_catalogo(args.catalogo) if os.path.exists(e.arquivo)]
+        construir_pacote(arquivos, args.saida)
+
+    for entrada in ler_catalogo(args.catalogo):
+        print(f"{entrada.rotulo}\t{entrada.arquivo}")
+
+
+if __name__ == "__main__":
+    main()
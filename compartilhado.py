@@ -0,0 +1,238 @@
+# compartilhado.py
+import json
+import logging
+import os
+import shutil
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from dados import (
+    DIR_COMPARTILHADO,
+    DIR_SNAPSHOT,
+    NAO_CONVERTIDAS,
+    ConjuntoDados,
+    carregar_dados,
+    versao_planilha,
+)
+from instrumentacao import contar_cache, medir
+from metricas import Posicoes, Variacoes
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava; a gravação continua atômica (rename)
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+# ===============================================================
+# Cache compartilhado entre processos (opcional)
+# ===============================================================
+# Com PAINEL_CACHE_COMPARTILHADO=<pasta> (de preferência em /dev/shm), a
+# primeira réplica/worker do host monta cada versão dos dados e grava as abas
+# e as variações/posições como arrays .npy; os demais processos só abrem os
+# arquivos com memory-map. As páginas ficam no cache do sistema uma única
+# vez, não importa quantos workers.
+
+# Incrementar sempre que o layout das pastas mudar
+FORMATO_COMPARTILHADO = 2
+
+ARQUIVO_TRAVA = ".trava"
+
+
+def _pasta_versao(versao: str, raiz: str) -> str:
+    return os.path.join(raiz, f"c{FORMATO_COMPARTILHADO}-{versao[:16]}")
+
+
+@contextmanager
+def _travar(raiz: str):
+    """
+    Trava exclusiva entre processos (flock) enquanto uma versão é montada.
+    """
+    with open(os.path.join(raiz, ARQUIVO_TRAVA), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# ===============================================================
+# Gravação
+# ===============================================================
+def _gravar_aba(df_: pd.DataFrame, pasta: str, chave: str) -> dict:
+    colunas = []
+    for i, (nome, serie) in enumerate(df_.items()):
+        arquivo = f"{chave}-{i}.npy"
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            np.save(os.path.join(pasta, arquivo), serie.cat.codes.to_numpy())
+            colunas.append({"nome": nome, "tipo": "categoria", "arquivo": arquivo,
+                            "categorias": [str(c) for c in serie.cat.categories]})
+        elif serie.dtype.kind in "fiu":
+            np.save(os.path.join(pasta, arquivo), serie.to_numpy())
+            colunas.append({"nome": nome, "tipo": "numero", "arquivo": arquivo})
+        else:
+            # texto (aba original, tempos): códigos + valores distintos
+            codigos, valores = pd.factorize(serie)
+            np.save(os.path.join(pasta, arquivo), codigos)
+            colunas.append({"nome": nome, "tipo": "texto", "arquivo": arquivo,
+                            "categorias": [str(v) for v in valores]})
+    return {"linhas": len(df_), "colunas": colunas}
+
+
+def _gravar_matrizes(grupos: dict, pasta: str, prefixo: str) -> dict:
+    """
+    Variações/posições (NamedTuple de DataFrames por aba e série), cada
+    campo como uma matriz linhas x etapas.
+    """
+    manifesto = {}
+    for chave, series in grupos.items():
+        manifesto[chave] = {}
+        for serie, tupla in series.items():
+            item = {"colunas": list(tupla[0].columns)}
+            for campo, df_ in tupla._asdict().items():
+                arquivo = f"{prefixo}-{chave}-{serie}-{campo}.npy"
+                np.save(os.path.join(pasta, arquivo), df_.to_numpy())
+                item[campo] = arquivo
+            manifesto[chave][serie] = item
+    return manifesto
+
+
+def gravar_conjunto(dados: ConjuntoDados, pasta: str, planilha: str) -> None:
+    """
+    Grava a versão numa pasta temporária e renomeia no final (quem abrir
+    nunca vê uma versão pela metade).
+    """
+    tmp = f"{pasta}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    manifesto = {
+        "versao": dados.versao,
+        "formato": FORMATO_COMPARTILHADO,
+        "planilha": planilha,
+        "abas": {chave: _gravar_aba(df_, tmp, chave) for chave, df_ in dados.abas.items()},
+        NAO_CONVERTIDAS: _gravar_aba(dados.nao_convertidas, tmp, NAO_CONVERTIDAS),
+        "variacoes": _gravar_matrizes(dados.variacoes, tmp, "var"),
+        "posicoes": _gravar_matrizes(dados.posicoes, tmp, "pos"),
+    }
+    with open(os.path.join(tmp, "manifesto.json"), "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False)
+
+    try:
+        os.rename(tmp, pasta)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _apagar_versoes_antigas(raiz: str, atual: str, planilha: str) -> None:
+    """
+    Remove as outras versões da mesma planilha. Processos que ainda usam
+    uma delas não são afetados: o memory-map continua válido depois que o
+    arquivo sai do diretório.
+    """
+    for nome in os.listdir(raiz):
+        pasta = os.path.join(raiz, nome)
+        if pasta == atual or not os.path.isdir(pasta) or ".tmp-" in nome:
+            continue
+        try:
+            with open(os.path.join(pasta, "manifesto.json"), encoding="utf-8") as f:
+                if json.load(f).get("planilha") != planilha:
+                    continue
+        except (OSError, ValueError):
+            continue
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+# ===============================================================
+# Abertura (sem cópia: arrays em memory-map somente leitura)
+# ===============================================================
+def _abrir_aba(info: dict, pasta: str) -> pd.DataFrame:
+    colunas = {}
+    for col in info["colunas"]:
+        arr = np.load(os.path.join(pasta, col["arquivo"]), mmap_mode="r")
+        if col["tipo"] == "numero":
+            colunas[col["nome"]] = arr
+        elif col["tipo"] == "categoria":
+            colunas[col["nome"]] = pd.Categorical.from_codes(
+                arr, dtype=pd.CategoricalDtype(pd.Index(col["categorias"])), validate=False
+            )
+        else:
+            valores = np.asarray(col["categorias"] + [np.nan], dtype=object)
+            colunas[col["nome"]] = pd.array(valores[arr], dtype="str")
+    return pd.DataFrame(colunas, index=pd.RangeIndex(info["linhas"]), copy=False)
+
+
+def _abrir_matrizes(manifesto: dict, pasta: str, abas: dict, tipo) -> dict:
+    return {
+        chave: {
+            serie: tipo(**{
+                campo: pd.DataFrame(
+                    np.load(os.path.join(pasta, item[campo]), mmap_mode="r"),
+                    index=abas[chave].index, columns=item["colunas"], copy=False,
+                )
+                for campo in tipo._fields
+            })
+            for serie, item in series.items()
+        }
+        for chave, series in manifesto.items()
+    }
+
+
+def abrir_conjunto(pasta: str):
+    """
+    ConjuntoDados de uma versão já gravada, com abas, variações e posições
+    apontando para os arquivos; None se a versão não estiver completa.
+    Índice, escolas válidas e busca são leves e calculados no processo.
+    """
+    try:
+        with open(os.path.join(pasta, "manifesto.json"), encoding="utf-8") as f:
+            manifesto = json.load(f)
+    except OSError:
+        return None
+
+    abas = {chave: _abrir_aba(info, pasta) for chave, info in manifesto["abas"].items()}
+    dados = ConjuntoDados(
+        manifesto["versao"], abas,
+        nao_convertidas=_abrir_aba(manifesto[NAO_CONVERTIDAS], pasta),
+    )
+    # cached_property: atribuir evita recalcular no processo
+    dados.variacoes = _abrir_matrizes(manifesto["variacoes"], pasta, abas, Variacoes)
+    dados.posicoes = _abrir_matrizes(manifesto["posicoes"], pasta, abas, Posicoes)
+    return dados
+
+
+def carregar_compartilhado(caminho: str, dir_snapshot: str = DIR_SNAPSHOT,
+                           raiz: str = DIR_COMPARTILHADO) -> ConjuntoDados:
+    """
+    Versão atual da planilha a partir do cache compartilhado. Só um
+    processo por vez monta uma versão ausente (os demais esperam na trava
+    e depois só abrem os arquivos).
+    """
+    pasta = _pasta_versao(versao_planilha(caminho), raiz)
+    with medir("abrir_compartilhado"):
+        dados = abrir_conjunto(pasta)
+    contar_cache("compartilhado", acerto=dados is not None)
+    if dados is not None:
+        return dados
+
+    os.makedirs(raiz, exist_ok=True)
+    with _travar(raiz):
+        # outro processo pode ter montado a versão enquanto esperávamos
+        dados = abrir_conjunto(pasta)
+        if dados is None:
+            with medir("montar_compartilhado"):
+                montado = carregar_dados(caminho, dir_snapshot).preparar()
+                pasta = _pasta_versao(montado.versao, raiz)
+                # caminho completo: planilhas de mesmo nome em pastas de
+                # anos/ciclos diferentes não apagam as versões uma da outra
+                planilha = os.path.abspath(caminho)
+                gravar_conjunto(montado, pasta, planilha)
+                _apagar_versoes_antigas(raiz, pasta, planilha)
+            logger.info("Cache compartilhado: versão %s gravada em %s", montado.versao[:12], pasta)
+            dados = abrir_conjunto(pasta)
+    return dados
@@ -0,0 +1,992 @@
+# dados.py
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import cached_property
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from busca import IndiceBusca
+from instrumentacao import contar_cache, cronometrado, medir
+from metricas import calcular_agregados, calcular_posicoes, calcular_variacoes
+
+logger = logging.getLogger(__name__)
+
+# As partições do índice são views das abas em cache: com Copy-on-Write
+# (padrão a partir do pandas 3) nenhuma escrita numa delas vaza para as demais
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+
+# ===============================================================
+# Arquivos e abas da planilha
+# ===============================================================
+ARQUIVO_DADOS = "Dados_RJ.xlsx"
+
+# Pasta onde ficam os snapshots colunares (um subdiretório por hash)
+DIR_SNAPSHOT = os.environ.get("PAINEL_SNAPSHOT_DIR", ".snapshot")
+
+# Pacote de dados pré-montado (`python catalogo.py construir`): snapshots no
+# mesmo formato, gerados offline, para uma réplica nova subir sem ler o Excel
+# (nem importar o openpyxl) e até sem o Excel no disco
+DIR_PACOTE = os.environ.get("PAINEL_PACOTE_DIR", "pacote_dados")
+ARQUIVO_INDICE_PACOTE = "pacote.json"
+
+# Cache compartilhado entre os processos do host (ver compartilhado.py);
+# vazio = desligado, cada processo monta a sua cópia
+DIR_COMPARTILHADO = os.environ.get("PAINEL_CACHE_COMPARTILHADO", "")
+
+# Incrementar sempre que o conteúdo/formato do snapshot mudar
+FORMATO_SNAPSHOT = 4
+
+# chave interna -> nome da aba no Excel
+ABAS = {
+    "original": "Original",
+    "redacao": "Dados_Redação",
+    "objetivas": "Dados_Objetivas",
+    "participacao": "Dados_Participação",
+    "acessos": "Dados_Acesso_Detalhado",
+}
+
+
+# ===============================================================
+# Constantes de colunas
+# ===============================================================
+COL_CODIGO   = "Código Interno"
+COL_REGIONAL = "Regional"
+COL_ESCOLA   = "Escola"
+
+# Séries por etapa de cada aba: série -> (modelo do cabeçalho, é percentual).
+# As etapas vêm dos próprios cabeçalhos ("<etapa>: Nota"), então planilhas de
+# outros anos/ciclos, com outras etapas, não exigem mudar o código.
+SERIES_ETAPAS = {
+    "redacao": {
+        "part": ("{}: Participação (%)", True),
+        "notas": ("{}: Nota", False),
+    },
+    "objetivas": {
+        "part": ("Objetivas - {}: Participação (%)", True),
+        "acertos": ("Objetivas - {}: Acertos (%)", True),
+    },
+    "participacao": {
+        "participantes": ("Número de Participantes: {}", False),
+    },
+}
+
+# Colunas percentuais sem etapa (aba de acessos): "% Alunos c/Acesso" etc.
+PREFIXO_PERCENTUAL = "%"
+
+
+# Como as escolas se agregam na regional e no estado em cada série, as mesmas
+# regras das linhas-resumo da planilha (ver metricas.calcular_agregados). Nas
+# regras "ponderada" e "taxa" o peso é o número de participantes da escola na
+# mesma etapa (SERIE_PESOS); as séries ausentes usam a média simples.
+REGRAS_AGREGACAO = {
+    ("redacao", "notas"): "ponderada",
+    ("redacao", "part"): "taxa",
+    ("participacao", "participantes"): "soma",
+}
+SERIE_PESOS = ("participacao", "participantes")
+
+# Código da escola no fim do nome ("CE ... - 25266") nas abas sem Código Interno
+PADRAO_CODIGO_NO_NOME = r"\s-\s*(\d+)\s*$"
+
+
+# Séries que precisam estar completas para a escola aparecer em cada aba
+# (aba -> (série de participação, série de notas/acertos))
+SERIES_COMPLETUDE = {
+    "redacao": ("part", "notas"),
+    "objetivas": ("part", "acertos"),
+}
+
+
+# ===============================================================
+# Leitura do Excel (caminho lento, via openpyxl)
+# ===============================================================
+def _limpar_colunas(df_: pd.DataFrame) -> pd.DataFrame:
+    df_.columns = (
+        df_.columns
+        .str.strip()
+        .str.replace('\ufeff', '', regex=False)
+    )
+    return df_
+
+
+# Leitura das abas em processos separados (PAINEL_LEITURA_PARALELA=1). Desligada
+# por padrão: cada processo novo gasta ~0,45 s só para importar dados e
+# openpyxl, mais da metade da leitura sequencial da planilha real inteira.
+# Compare as etapas ler_excel_* de benchmarks/executar.py antes de ligar.
+LEITURA_PARALELA = os.environ.get("PAINEL_LEITURA_PARALELA") == "1"
+
+
+def ler_aba(caminho: str, chave: str):
+    """
+    Lê uma aba do Excel (tudo como texto). Função de módulo para poder rodar
+    em outro processo. Retorna (chave, DataFrame, segundos).
+    """
+    inicio = time.perf_counter()
+    df_ = pd.read_excel(caminho, sheet_name=ABAS[chave], dtype=str)
+    return chave, _limpar_colunas(df_), time.perf_counter() - inicio
+
+
+def ler_planilhas(caminho: str, paralelo: bool = LEITURA_PARALELA, processos: int = None):
+    """
+    Lê as abas usadas pelo painel direto do Excel (tudo como texto).
+    Com paralelo=True (e mais de um processo) as abas são lidas em processos
+    separados, cada um abrindo o arquivo em modo somente leitura. Retorna
+    (abas, tempos), com o tempo de leitura de cada aba em segundos.
+    """
+    resultados = None
+    if processos is None:
+        # com um só núcleo, processos extras só somam o custo de reabrir o arquivo
+        processos = min(len(ABAS), os.cpu_count() or 1)
+    if paralelo and processos > 1:
+        try:
+            # sem "fork": a recarga roda numa thread, com as do Streamlit ativas,
+            # e um fork copiaria travas seguras por outras threads
+            metodo = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            with ProcessPoolExecutor(max_workers=processos,
+                                     mp_context=multiprocessing.get_context(metodo)) as pool:
+                resultados = list(pool.map(ler_aba, [caminho] * len(ABAS), list(ABAS)))
+        except (OSError, BrokenProcessPool):
+            # ambiente sem suporte a subprocessos: cai para a leitura sequencial
+            logger.warning("Leitura paralela indisponível; lendo as abas em sequência")
+
+    if resultados is None:
+        xls = pd.ExcelFile(caminho)
+        resultados = []
+        for chave, aba in ABAS.items():
+            inicio = time.perf_counter()
+            df_ = _limpar_colunas(pd.read_excel(xls, sheet_name=aba, dtype=str))
+            resultados.append((chave, df_, time.perf_counter() - inicio))
+
+    dfs, tempos = {}, {}
+    for chave, df_, segundos in resultados:
+        dfs[chave] = df_
+        tempos[chave] = segundos
+        logger.info("Aba %s lida do Excel em %.3fs", ABAS[chave], segundos)
+    return dfs, tempos
+
+
+# ===============================================================
+# Normalização: converte as colunas numéricas uma única vez
+# ===============================================================
+# Tabela gravada junto com as abas no snapshot: células das colunas
+# numéricas que não estão no formato da planilha (ver celulas_nao_convertidas)
+NAO_CONVERTIDAS = "nao_convertidas"
+COLUNAS_NAO_CONVERTIDAS = ["aba", "linha_excel", "regional", "escola", "coluna", "valor"]
+
+# '85,12%', '1.202', '202,71'; vazias: '', '-', '----'
+_PADRAO_NUMERO = r"-?(?:\d{1,3}(?:\.\d{3})+|\d+)(?:,\d+)?%?"
+_PADRAO_VAZIO = r"-*"
+
+
+def celulas_nao_convertidas(dfs: dict) -> pd.DataFrame:
+    """
+    Células (texto cru do Excel) das colunas numéricas que não são número no
+    formato da planilha nem marcador de vazio: na conversão elas viram NaN
+    ou um número errado ('1.2.3%' -> 123). Uma passada vetorizada por aba,
+    com todas as colunas numéricas de uma vez.
+    """
+    partes = []
+    for chave, df_ in dfs.items():
+        cols = [c for c in sum(colunas_numericas(chave, df_), []) if c in df_.columns]
+        if not cols or df_.empty:
+            continue
+        texto = pd.Series(df_[cols].to_numpy(dtype=object).ravel()).fillna("").astype(str).str.strip()
+        ruim = ~(texto.str.fullmatch(_PADRAO_NUMERO) | texto.str.fullmatch(_PADRAO_VAZIO)).to_numpy()
+        linhas, colunas = np.divmod(np.flatnonzero(ruim), len(cols))
+
+        def coluna_texto(nome):
+            if nome not in df_.columns:
+                return np.full(len(linhas), None, dtype=object)
+            return df_[nome].to_numpy(dtype=object)[linhas]
+
+        partes.append(pd.DataFrame({
+            "aba": ABAS[chave],
+            "linha_excel": linhas + 2,  # linha 1 é o cabeçalho
+            "regional": coluna_texto(COL_REGIONAL),
+            "escola": coluna_texto(COL_ESCOLA),
+            "coluna": np.asarray(cols, dtype=object)[colunas],
+            "valor": texto.to_numpy()[ruim],
+        }))
+
+    if not partes:
+        return pd.DataFrame({
+            c: pd.Series(dtype="int64" if c == "linha_excel" else "str")
+            for c in COLUNAS_NAO_CONVERTIDAS
+        })
+    tabela = pd.concat(partes, ignore_index=True)
+    texto = [c for c in COLUNAS_NAO_CONVERTIDAS if c != "linha_excel"]
+    tabela[texto] = tabela[texto].astype("str")
+    return tabela.astype({"linha_excel": "int64"})
+
+
+@cronometrado("serie_para_float")
+def serie_para_float(s: pd.Series, eh_percentual: bool = False) -> pd.Series:
+    """
+    Converte uma Series com valores tipo '85,12%' / '202,71'
+    em float. Se eh_percentual=True, remove '%'.
+    """
+    s = s.astype(str).str.strip()
+
+    if eh_percentual:
+        s = s.str.replace('%', '', regex=False)
+
+    # remove separador de milhar e troca vírgula por ponto
+    s = s.str.replace('.', '', regex=False)
+    s = s.str.replace(',', '.', regex=False)
+
+    return pd.to_numeric(s, errors="coerce")
+
+
+
+class EtapasAba(NamedTuple):
+    etapas: list  # nomes das etapas, na ordem das colunas da planilha
+    series: dict  # série -> colunas (uma por etapa, na mesma ordem)
+
+
+def _padrao_cabecalho(modelo: str) -> re.Pattern:
+    # "{}: Nota" -> "^(.+): Nota$"
+    return re.compile("^" + re.escape(modelo).replace(re.escape("{}"), "(.+)") + "$")
+
+
+def descobrir_etapas(chave: str, colunas) -> EtapasAba:
+    """
+    Etapas de uma aba a partir dos cabeçalhos. A primeira série da aba
+    define as etapas, e só entram as que têm coluna em todas as séries
+    (uma etapa sem "Nota" não entra pela metade).
+    """
+    modelos = SERIES_ETAPAS.get(chave)
+    if not modelos:
+        return EtapasAba([], {})
+
+    colunas = [str(c) for c in colunas]
+    presentes = set(colunas)
+    padrao = _padrao_cabecalho(next(iter(modelos.values()))[0])
+
+    etapas = []
+    for c in colunas:
+        m = padrao.match(c)
+        if m is None or m.group(1) in etapas:
+            continue
+        if all(modelo.format(m.group(1)) in presentes for modelo, _ in modelos.values()):
+            etapas.append(m.group(1))
+
+    series = {
+        serie: [modelo.format(e) for e in etapas]
+        for serie, (modelo, _) in modelos.items()
+    }
+    return EtapasAba(etapas, series)
+
+
+def colunas_numericas(chave: str, df_: pd.DataFrame):
+    """
+    Retorna (colunas percentuais, colunas decimais) de cada aba.
+    A aba "original" não é usada pelo painel e continua como texto.
+    """
+    if chave in SERIES_ETAPAS:
+        series = descobrir_etapas(chave, df_.columns).series
+        cols_pct, cols_dec = [], []
+        for serie, (_, eh_percentual) in SERIES_ETAPAS[chave].items():
+            (cols_pct if eh_percentual else cols_dec).extend(series[serie])
+        return cols_pct, cols_dec
+    if chave == "acessos":
+        return [c for c in df_.columns if str(c).startswith(PREFIXO_PERCENTUAL)], []
+    return [], []
+
+
+def normalizar_planilhas(dfs: dict) -> dict:
+    """
+    Converte os textos no formato brasileiro ('85,12%', '1.202,71') em
+    float. Percentuais ficam em pontos percentuais (85.12), como na planilha;
+    contagens de participantes são arredondadas. As células que não puderam
+    ser lidas como número vão em tipados[NAO_CONVERTIDAS].
+    """
+    tipados = {}
+    for chave, df_ in dfs.items():
+        df_ = df_.copy()
+        cols_pct, cols_dec = colunas_numericas(chave, df_)
+        for c in cols_pct:
+            if c in df_.columns:
+                df_[c] = serie_para_float(df_[c], eh_percentual=True)
+        for c in cols_dec:
+            if c in df_.columns:
+                df_[c] = serie_para_float(df_[c], eh_percentual=False)
+        if chave == "participacao":
+            df_[cols_dec] = df_[cols_dec].round()
+        tipados[chave] = compactar_aba(df_, cols_pct + cols_dec)
+    tipados[NAO_CONVERTIDAS] = celulas_nao_convertidas(dfs)
+    return tipados
+
+
+def compactar_aba(df_: pd.DataFrame, cols_num) -> pd.DataFrame:
+    """
+    Representação compacta para manter em memória (e no snapshot):
+    - Regional/Escola/Código Interno como categóricas;
+    - métricas em float32;
+    - linhas agrupadas por regional (escolas primeiro, linha-resumo no fim),
+      para que cada partição do índice seja uma fatia contígua (view, sem
+      cópia). A ordem relativa das linhas dentro da regional é mantida.
+    """
+    cols_num = [c for c in cols_num if c in df_.columns]
+    df_[cols_num] = df_[cols_num].astype("float32")
+
+    if COL_REGIONAL in df_.columns and COL_ESCOLA in df_.columns:
+        resumo = mascara_resumo(df_).to_numpy()
+        ordem_regional = pd.factorize(df_[COL_REGIONAL], use_na_sentinel=False)[0]
+        df_ = df_.iloc[np.lexsort((resumo, ordem_regional))].reset_index(drop=True)
+
+    for c in (COL_REGIONAL, COL_ESCOLA, COL_CODIGO):
+        if c in df_.columns:
+            df_[c] = df_[c].astype("category")
+    return df_
+
+
+# ===============================================================
+# Snapshot colunar (Feather/Arrow) indexado pelo hash do Excel
+# ===============================================================
+def hash_arquivo(caminho: str) -> str:
+    """
+    SHA-256 do conteúdo do arquivo (lido em blocos).
+    """
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+# Nome das pastas de snapshot ("v4-<16 hex>"); outras pastas nunca são apagadas
+_PADRAO_PASTA_SNAPSHOT = re.compile(r"v\d+-[0-9a-f]{16}")
+
+
+def _pasta_snapshot(versao: str, dir_snapshot: str) -> str:
+    return os.path.join(dir_snapshot, f"v{FORMATO_SNAPSHOT}-{versao[:16]}")
+
+
+def ler_snapshot(pasta: str):
+    """
+    Abre um snapshot existente com memory-map. Retorna None se não houver
+    snapshot completo na pasta.
+    """
+    if not os.path.exists(os.path.join(pasta, "manifesto.json")):
+        return None
+
+    dfs = {}
+    for chave in [*ABAS, NAO_CONVERTIDAS]:
+        arquivo = os.path.join(pasta, f"{chave}.feather")
+        if not os.path.exists(arquivo):
+            return None
+        dfs[chave] = feather.read_table(arquivo, memory_map=True).to_pandas()
+    return dfs
+
+
+def salvar_snapshot(dfs: dict, pasta: str, versao: str, tempos: dict = None,
+                    planilha: str = None) -> None:
+    """
+    Grava o snapshot numa pasta temporária e renomeia no final, para que
+    outras réplicas nunca enxerguem um snapshot pela metade. `planilha`
+    (caminho completo do Excel) identifica as versões da mesma planilha
+    em apagar_snapshots_antigos.
+    """
+    os.makedirs(os.path.dirname(pasta) or ".", exist_ok=True)
+    tmp = f"{pasta}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    for chave, df_ in dfs.items():
+        # sem compressão: permite abrir com memory-map sem descompactar
+        feather.write_feather(
+            df_, os.path.join(tmp, f"{chave}.feather"), compression="uncompressed"
+        )
+
+    with open(os.path.join(tmp, "manifesto.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "versao": versao,
+            "formato": FORMATO_SNAPSHOT,
+            "abas": ABAS,
+            "tempos_leitura": tempos or {},
+            "planilha": planilha,
+        }, f)
+
+    try:
+        os.rename(tmp, pasta)
+    except OSError:
+        # outra réplica gravou o mesmo snapshot primeiro
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def apagar_snapshots_antigos(dir_snapshot: str, versao: str, planilha: str) -> None:
+    """
+    Remove os snapshots locais das outras versões da mesma planilha e os de
+    formatos anteriores (que nenhuma versão abre mais). Só toca em pastas
+    com o nome de snapshot; as das outras planilhas do catálogo ficam.
+    Processos que ainda usam uma versão apagada não são afetados: o
+    memory-map continua válido depois que o arquivo sai do diretório.
+    """
+    atual = os.path.basename(_pasta_snapshot(versao, dir_snapshot))
+    try:
+        nomes = os.listdir(dir_snapshot)
+    except OSError:
+        return
+    for nome in nomes:
+        if nome == atual or not _PADRAO_PASTA_SNAPSHOT.fullmatch(nome):
+            continue
+        pasta = os.path.join(dir_snapshot, nome)
+        try:
+            with open(os.path.join(pasta, "manifesto.json"), encoding="utf-8") as f:
+                manifesto = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if manifesto.get("formato") == FORMATO_SNAPSHOT and manifesto.get("planilha") != planilha:
+            continue
+        shutil.rmtree(pasta, ignore_errors=True)
+        logger.info("Snapshot antigo removido: %s", pasta)
+
+
+# ===============================================================
+# Pacote de dados (snapshots gerados offline)
+# ===============================================================
+def _ler_indice_pacote(dir_pacote: str) -> dict:
+    caminho = os.path.join(dir_pacote, ARQUIVO_INDICE_PACOTE)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as f:
+        indice = json.load(f)
+    if indice.get("formato") != FORMATO_SNAPSHOT:
+        # pacote de um formato anterior: os snapshots dele não servem mais
+        logger.warning("Pacote em %s com formato antigo; ignorado", dir_pacote)
+        return {}
+    return indice.get("planilhas", {})
+
+
+def chave_pacote(caminho: str) -> str:
+    """
+    Chave da planilha no índice do pacote: o caminho relativo à pasta de
+    trabalho (a do catálogo), com "/". Planilhas de mesmo nome em pastas
+    de anos/ciclos diferentes ("2024/Dados_RJ.xlsx") não se confundem.
+    """
+    return os.path.relpath(caminho).replace(os.sep, "/")
+
+
+def versao_no_pacote(caminho: str, dir_pacote: str = DIR_PACOTE):
+    """
+    Versão (hash) da planilha guardada no pacote; None se ela não estiver
+    no pacote.
+    """
+    return _ler_indice_pacote(dir_pacote).get(chave_pacote(caminho))
+
+
+def construir_pacote(caminhos, dir_pacote: str = DIR_PACOTE) -> dict:
+    """
+    Lê e normaliza cada planilha e grava o snapshot dela no pacote (as que
+    já estão lá, com o mesmo hash, não são refeitas). Snapshots que não
+    pertencem a nenhuma planilha do pacote são apagados.
+    Retorna {chave da planilha (ver chave_pacote): versão}.
+    """
+    indice = _ler_indice_pacote(dir_pacote)
+    for caminho in caminhos:
+        versao = hash_arquivo(caminho)
+        pasta = _pasta_snapshot(versao, dir_pacote)
+        if ler_snapshot(pasta) is None:
+            dfs, tempos = ler_planilhas(caminho)
+            salvar_snapshot(normalizar_planilhas(dfs), pasta, versao, tempos)
+            logger.info("Pacote: %s -> %s", caminho, os.path.basename(pasta))
+        indice[chave_pacote(caminho)] = versao
+
+    em_uso = {os.path.basename(_pasta_snapshot(v, dir_pacote)) for v in indice.values()}
+    for nome in os.listdir(dir_pacote):
+        if _PADRAO_PASTA_SNAPSHOT.fullmatch(nome) and nome not in em_uso:
+            shutil.rmtree(os.path.join(dir_pacote, nome), ignore_errors=True)
+
+    tmp = os.path.join(dir_pacote, f"{ARQUIVO_INDICE_PACOTE}.tmp-{os.getpid()}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"formato": FORMATO_SNAPSHOT, "planilhas": indice}, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, os.path.join(dir_pacote, ARQUIVO_INDICE_PACOTE))
+    return indice
+
+
+# ===============================================================
+# Índice por regional (partições pré-calculadas)
+# ===============================================================
+class ParticaoRegional(NamedTuple):
+    todas: pd.DataFrame    # escolas + linha-resumo da regional
+    escolas: pd.DataFrame  # apenas escolas
+    resumo: pd.DataFrame   # linha-resumo (Escola ≈ nome da regional); pode vir vazia
+
+
+def mascara_resumo(df_: pd.DataFrame) -> pd.Series:
+    """
+    Marca as linhas-resumo: aquelas em que a Escola é o próprio nome da
+    regional (comparação robusta a espaços e caixa).
+    """
+    escola = df_[COL_ESCOLA].astype(str).str.strip().str.upper()
+    regional = df_[COL_REGIONAL].astype(str).str.strip().str.upper()
+    return escola == regional
+
+
+def codigos_escola(df_: pd.DataFrame) -> pd.Series:
+    """
+    Código da escola: Código Interno, ou o sufixo " - <código>" do nome.
+    """
+    if COL_CODIGO in df_.columns:
+        return df_[COL_CODIGO].astype("str").str.strip()
+    return df_[COL_ESCOLA].astype("str").str.extract(PADRAO_CODIGO_NO_NOME, expand=False)
+
+
+def indexar_aba(df_: pd.DataFrame) -> dict:
+    """
+    Separa a aba em partições por regional, de uma só vez.
+    """
+    if COL_REGIONAL not in df_.columns or COL_ESCOLA not in df_.columns:
+        return {}
+
+    resumo = mascara_resumo(df_).to_numpy()
+    indice = {}
+    grupos = df_.groupby(COL_REGIONAL, sort=False, observed=True).indices
+    for regional, pos in grupos.items():
+        inicio, fim = pos[0], pos[-1] + 1
+        n_escolas = len(pos) - int(resumo[pos].sum())
+        if fim - inicio == len(pos) and not resumo[inicio:inicio + n_escolas].any():
+            # aba compactada (ver compactar_aba): fatias contíguas, sem cópia
+            indice[regional] = ParticaoRegional(
+                todas=df_.iloc[inicio:fim],
+                escolas=df_.iloc[inicio:inicio + n_escolas],
+                resumo=df_.iloc[inicio + n_escolas:fim],
+            )
+        else:
+            todas = df_.iloc[pos]
+            eh_resumo = resumo[pos]
+            indice[regional] = ParticaoRegional(
+                todas=todas,
+                escolas=todas[~eh_resumo],
+                resumo=todas[eh_resumo],
+            )
+    return indice
+
+
+class EscolasValidas(NamedTuple):
+    linhas: pd.DataFrame     # linhas sem faltantes (pode incluir a linha-resumo)
+    nomes: list              # escolas ordenadas, sem a linha-resumo
+    linha_por_escola: dict   # nome da escola -> rótulo da primeira linha completa
+
+
+def calcular_escolas_validas(df_: pd.DataFrame, indice: dict, cols_part, cols_notas) -> dict:
+    """
+    Para cada regional, as linhas sem NaN nas colunas indicadas e a lista
+    de escolas selecionáveis. A máscara de completude é calculada uma vez
+    para a aba inteira.
+    """
+    completa = (
+        df_[cols_part].notna().all(axis=1) &
+        df_[cols_notas].notna().all(axis=1)
+    )
+
+    validas = {}
+    for regional, particao in indice.items():
+        linhas = particao.todas[completa.loc[particao.todas.index]]
+
+        reg_norm = str(regional).strip().upper()
+        escolas = linhas[COL_ESCOLA]
+        escolas = escolas[
+            escolas.notna() &
+            (escolas.astype(str).str.strip().str.upper() != reg_norm)
+        ].astype(str)
+        # primeira ocorrência de cada nome (nomes repetidos na mesma regional)
+        linha_por_escola = {
+            nome: rotulo for rotulo, nome in escolas[~escolas.duplicated()].items()
+        }
+
+        validas[regional] = EscolasValidas(
+            linhas=linhas,
+            nomes=sorted(linha_por_escola),
+            linha_por_escola=linha_por_escola,
+        )
+    return validas
+
+
+class ConjuntoDados:
+    """
+    Abas tipadas de uma versão do Excel e as estruturas derivadas delas,
+    calculadas uma única vez por versão.
+    """
+
+    def __init__(self, versao: str, abas: dict, tempos_leitura: dict = None,
+                 nao_convertidas: pd.DataFrame = None):
+        self.versao = versao
+        self.abas = abas
+        # segundos de leitura de cada aba do Excel (vazio se veio do snapshot)
+        self.tempos_leitura = tempos_leitura or {}
+        # células que não eram número no Excel (ver celulas_nao_convertidas)
+        self.nao_convertidas = (
+            nao_convertidas if nao_convertidas is not None else celulas_nao_convertidas({})
+        )
+
+    def __getitem__(self, chave: str) -> pd.DataFrame:
+        return self.abas[chave]
+
+    @cached_property
+    def etapas(self) -> dict:
+        """
+        Etapas e colunas de cada série por aba, descobertas nos cabeçalhos:
+        etapas["redacao"].series["notas"] -> ["1º Simulado: Nota", ...].
+        """
+        return {chave: descobrir_etapas(chave, df_.columns) for chave, df_ in self.abas.items()}
+
+    def colunas(self, chave: str, serie: str) -> list:
+        """
+        Colunas da série na aba, em ordem de etapa (vazia se não houver).
+        """
+        return self.etapas[chave].series.get(serie, [])
+
+    @cached_property
+    def indice(self) -> dict:
+        return {chave: indexar_aba(df_) for chave, df_ in self.abas.items()}
+
+    def particao(self, chave: str, regional: str) -> ParticaoRegional:
+        """
+        Linhas da regional na aba indicada (partição vazia se não houver).
+        """
+        particao = self.indice[chave].get(regional)
+        if particao is None:
+            vazia = self.abas[chave].iloc[0:0]
+            particao = ParticaoRegional(vazia, vazia, vazia)
+        return particao
+
+    @cached_property
+    def validas(self) -> dict:
+        """
+        Escolas válidas de todas as regionais, por aba (memoizado; um novo
+        ConjuntoDados é criado quando o Excel muda).
+        """
+        return {
+            chave: calcular_escolas_validas(
+                self.abas[chave], self.indice[chave],
+                *(self.colunas(chave, serie) for serie in series),
+            )
+            for chave, series in SERIES_COMPLETUDE.items()
+        }
+
+    def escolas_validas(self, chave: str, regional: str) -> EscolasValidas:
+        """
+        Escolas sem faltantes da regional na aba indicada.
+        """
+        validas = self.validas[chave].get(regional)
+        if validas is None:
+            validas = EscolasValidas(self.abas[chave].iloc[0:0], [], {})
+        return validas
+
+    @cached_property
+    def variacoes(self) -> dict:
+        """
+        Variações absoluta/relativa entre etapas de todas as linhas, por aba
+        e série: variacoes["redacao"]["notas"].absoluta.loc[rotulo].
+        """
+        return {
+            chave: {
+                serie: calcular_variacoes(df_, cols)
+                for serie, cols in self.etapas[chave].series.items()
+            }
+            for chave, df_ in self.abas.items()
+        }
+
+    @cached_property
+    def posicoes(self) -> dict:
+        """
+        Posição e percentil de cada escola por etapa, na regional e no
+        estado, por aba e série: posicoes["redacao"]["notas"].percentil_estado.
+        """
+        resultado = {}
+        for chave in SERIES_COMPLETUDE:
+            df_ = self.abas[chave]
+            escolas = ~mascara_resumo(df_)
+            resultado[chave] = {
+                serie: calcular_posicoes(df_, cols, df_[COL_REGIONAL], escolas)
+                for serie, cols in self.etapas[chave].series.items()
+            }
+        return resultado
+
+    def _participantes_por_etapa(self, df_: pd.DataFrame, etapas: list) -> np.ndarray:
+        """
+        Participantes de cada linha de `df_` em cada etapa (aba de
+        participação, ligada pelo código da escola). NaN sem correspondência
+        ou sem a etapa.
+        """
+        aba, serie = SERIE_PESOS
+        part = self.abas.get(aba)
+        if part is None:
+            return np.full((len(df_), len(etapas)), np.nan)
+        part = part[~mascara_resumo(part).to_numpy()]
+        codigos = codigos_escola(part)
+        unicos = (codigos.notna() & ~codigos.duplicated()).to_numpy()
+        modelo = SERIES_ETAPAS[aba][serie][0]
+        tabela = (
+            part.loc[unicos]
+            .set_axis(codigos[unicos].to_numpy())
+            .reindex(columns=[modelo.format(e) for e in etapas])
+            .reindex(codigos_escola(df_).to_numpy())
+        )
+        return tabela.to_numpy(dtype="float64")
+
+    @cached_property
+    def agregados(self) -> dict:
+        """
+        Agregado das escolas por regional e do estado, por aba e série,
+        calculado das linhas de escola (não das linhas-resumo):
+        agregados["redacao"]["notas"].regional.loc[regional].
+        """
+        resultado = {}
+        for chave, df_ in self.abas.items():
+            etapas = self.etapas[chave]
+            if not etapas.series:
+                continue
+            escolas = df_[~mascara_resumo(df_).to_numpy()]
+            pesos = None
+            if any(REGRAS_AGREGACAO.get((chave, s)) in ("ponderada", "taxa") for s in etapas.series):
+                pesos = self._participantes_por_etapa(escolas, etapas.etapas)
+            resultado[chave] = {
+                serie: calcular_agregados(
+                    escolas, cols, escolas[COL_REGIONAL],
+                    REGRAS_AGREGACAO.get((chave, serie), "media"), pesos,
+                )
+                for serie, cols in etapas.series.items()
+            }
+        return resultado
+
+    def resumo_regional(self, chave: str, regional: str, colunas) -> pd.Series:
+        """
+        Valores da regional nas colunas indicadas: os da linha-resumo da
+        planilha, com o agregado das escolas onde ela falta (regional sem
+        linha-resumo ou célula vazia). None se não houver nenhum dos dois.
+        """
+        resumo = self.particao(chave, regional).resumo
+        valores = (
+            resumo[colunas].iloc[0].astype("float64") if not resumo.empty
+            else pd.Series(np.nan, index=colunas)
+        )
+        if valores.notna().all():
+            return valores
+        for agregados in self.agregados.get(chave, {}).values():
+            if regional in agregados.regional.index:
+                valores = valores.fillna(agregados.regional.loc[regional].reindex(colunas))
+        return None if valores.isna().all() else valores
+
+    @cached_property
+    def busca(self) -> dict:
+        """
+        Índice de busca por aba, com as escolas válidas de todo o estado.
+        """
+        indices = {}
+        for chave, validas_aba in self.validas.items():
+            df_ = self.abas[chave]
+            indices[chave] = IndiceBusca(
+                (nome, regional, df_.at[rotulo, COL_CODIGO])
+                for regional, validas in validas_aba.items()
+                for nome, rotulo in validas.linha_por_escola.items()
+            )
+        return indices
+
+    def preparar(self) -> "ConjuntoDados":
+        """
+        Calcula de uma vez as estruturas derivadas (antes de a versão
+        começar a atender sessões).
+        """
+        with medir("preparar_dados"):
+            # ler cada cached_property já calcula e guarda o valor
+            for nome in ("etapas", "indice", "validas", "variacoes", "posicoes", "busca", "agregados"):
+                getattr(self, nome)
+        return self
+
+
+def assinatura_arquivo(caminho: str) -> tuple:
+    """
+    (mtime, tamanho) do arquivo: barato o bastante para checar a cada rerun.
+    """
+    st_ = os.stat(caminho)
+    return st_.st_mtime_ns, st_.st_size
+
+
+def versao_planilha(caminho: str, dir_pacote: str = DIR_PACOTE) -> str:
+    """
+    Hash do Excel; sem o Excel no disco, a versão registrada no pacote.
+    """
+    if os.path.exists(caminho):
+        return hash_arquivo(caminho)
+    versao = versao_no_pacote(caminho, dir_pacote)
+    if versao is None:
+        raise FileNotFoundError(caminho)
+    return versao
+
+
+def carregar_dados(caminho: str = ARQUIVO_DADOS, dir_snapshot: str = DIR_SNAPSHOT,
+                   dir_pacote: str = DIR_PACOTE) -> ConjuntoDados:
+    """
+    Retorna as abas do painel já tipadas. Usa o snapshot colunar (local ou
+    do pacote pré-montado) quando o hash do Excel não mudou; caso contrário
+    lê e normaliza o Excel e grava um snapshot novo. Sem o Excel no disco,
+    usa a versão registrada no pacote.
+    """
+    versao = versao_planilha(caminho, dir_pacote)
+    pasta = _pasta_snapshot(versao, dir_snapshot)
+
+    with medir("ler_snapshot"):
+        dfs, tempos = ler_snapshot(pasta), {}
+        if dfs is None:
+            dfs = ler_snapshot(_pasta_snapshot(versao, dir_pacote))
+    contar_cache("snapshot", acerto=dfs is not None)
+    if dfs is None:
+        if not os.path.exists(caminho):
+            raise FileNotFoundError(
+                f"{caminho} não existe e o pacote em {dir_pacote} não tem snapshot "
+                f"desta versão; gere o pacote de novo com `python catalogo.py construir`"
+            )
+        with medir("ler_planilhas"):
+            dfs, tempos = ler_planilhas(caminho)
+        with medir("normalizar_planilhas"):
+            dfs = normalizar_planilhas(dfs)
+        try:
+            salvar_snapshot(dfs, pasta, versao, tempos, os.path.abspath(caminho))
+        except OSError:
+            # disco somente leitura: segue sem snapshot
+            pass
+
+    nao_convertidas = dfs.pop(NAO_CONVERTIDAS)
+    return ConjuntoDados(versao, dfs, tempos, nao_convertidas)
+
+
+
+# ===============================================================
+# Recarga a quente: troca de versão sem reiniciar o processo
+# ===============================================================
+class GerenciadorDados:
+    """
+    Mantém a versão atual dos dados de um Excel. Uma thread vigia o arquivo
+    (mtime/tamanho); quando ele muda e fica estável por um intervalo, a nova
+    versão é carregada e preparada em segundo plano e trocada de uma vez.
+    Enquanto isso, as sessões continuam recebendo a versão anterior.
+    """
+
+    def __init__(self, caminho: str = ARQUIVO_DADOS, dir_snapshot: str = DIR_SNAPSHOT,
+                 intervalo: float = 5.0, vigiar: bool = True,
+                 dir_compartilhado: str = DIR_COMPARTILHADO):
+        self.caminho = caminho
+        self.dir_snapshot = dir_snapshot
+        self.intervalo = intervalo
+        self.dir_compartilhado = dir_compartilhado
+
+        self._lock = threading.Lock()
+        self._parado = threading.Event()
+        self._recarregando = False
+        self._pendente = None
+        self._observadores = []
+        try:
+            self._assinatura = assinatura_arquivo(caminho)
+        except OSError:
+            # só no pacote pré-montado: recarrega se o Excel aparecer
+            self._assinatura = None
+        self._atual = self._carregar().preparar()
+        self._apagar_snapshots_antigos()
+
+        if vigiar:
+            threading.Thread(target=self._vigiar, name="vigia-dados", daemon=True).start()
+
+    def atual(self) -> ConjuntoDados:
+        """
+        Versão em uso. Cada rerun deve ler uma vez e usar a mesma até o fim.
+        """
+        return self._atual
+
+    def verificar(self) -> None:
+        """
+        Checa o arquivo e, se ele mudou e já está estável (mesma assinatura em
+        duas checagens seguidas, para não ler um arquivo pela metade), dispara
+        a recarga em segundo plano.
+        """
+        try:
+            assinatura = assinatura_arquivo(self.caminho)
+        except OSError:
+            # arquivo sendo substituído neste instante
+            return
+
+        with self._lock:
+            if assinatura == self._assinatura or self._recarregando:
+                return
+            if assinatura != self._pendente:
+                self._pendente = assinatura
+                return
+            self._recarregando = True
+
+        threading.Thread(
+            target=self._recarregar, args=(assinatura,), name="recarga-dados", daemon=True
+        ).start()
+
+    def _recarregar(self, assinatura: tuple) -> None:
+        try:
+            novo = self._carregar()
+            if novo.versao != self._atual.versao:
+                # atribuição única: quem já leu a versão anterior segue com ela
+                self._atual = novo.preparar()
+                logger.info("Dados recarregados: versão %s", novo.versao[:12])
+                self._apagar_snapshots_antigos()
+                self._avisar(self._atual)
+        except Exception:
+            logger.exception("Falha ao recarregar %s; mantendo a versão atual", self.caminho)
+        finally:
+            with self._lock:
+                # também em caso de falha: só tenta de novo quando o arquivo mudar outra vez
+                self._assinatura = assinatura
+                self._pendente = None
+                self._recarregando = False
+
+    def _apagar_snapshots_antigos(self) -> None:
+        # a versão em uso já está em memória: as anteriores só ocupariam disco
+        apagar_snapshots_antigos(self.dir_snapshot, self._atual.versao, os.path.abspath(self.caminho))
+
+    def observar(self, funcao) -> None:
+        """
+        Chama funcao(dados) com a versão atual e, depois, a cada versão nova
+        trocada pela recarga (ex.: aquecimento dos caches).
+        """
+        self._observadores.append(funcao)
+        funcao(self._atual)
+
+    def _avisar(self, dados: ConjuntoDados) -> None:
+        for funcao in list(self._observadores):
+            try:
+                funcao(dados)
+            except Exception:
+                logger.exception("Falha ao avisar a troca de versão de %s", self.caminho)
+
+    def _carregar(self) -> ConjuntoDados:
+        """
+        Versão atual do Excel: do cache compartilhado entre processos, quando
+        configurado, ou montada neste processo.
+        """
+        if self.dir_compartilhado:
+            # import tardio: compartilhado.py depende deste módulo
+            from compartilhado import carregar_compartilhado
+            return carregar_compartilhado(self.caminho, self.dir_snapshot, self.dir_compartilhado)
+        return carregar_dados(self.caminho, self.dir_snapshot)
+
+    def parar(self) -> None:
+        """
+        Encerra a vigia do arquivo (a versão atual continua utilizável por
+        quem já a tem).
+        """
+        self._parado.set()
+
+    def _vigiar(self) -> None:
+        while not self._parado.wait(self.intervalo):
+            self.verificar()
@@ -0,0 +1,562 @@
+# graficos.py
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from dados import COL_ESCOLA
+from metricas import formatar_posicao, formatar_variacao
+
+
+# ===============================================================
+# Formatação de números (padrão brasileiro)
+# ===============================================================
+def fmt_int(v):
+    if pd.isna(v):
+        return ""
+    return f"{int(round(v))}"
+
+
+
+def textos_posicao(posicoes, rotulo, colunas) -> tuple:
+    """
+    (na regional, no estado) de uma linha, prontos para o hover.
+    """
+    p = posicoes
+    return (
+        formatar_posicao(p.posicao_regional.loc[rotulo, colunas], p.total_regional.loc[rotulo, colunas],
+                         p.percentil_regional.loc[rotulo, colunas]),
+        formatar_posicao(p.posicao_estado.loc[rotulo, colunas], p.total_estado.loc[rotulo, colunas],
+                         p.percentil_estado.loc[rotulo, colunas]),
+    )
+
+
+
+def para_exibicao(s: pd.Series) -> pd.Series:
+    """
+    As métricas ficam em float32 na memória; no gráfico voltam a float64
+    arredondado, para o JSON não carregar ruído de precisão (85.12000274...).
+    """
+    return s.astype("float64").round(4)
+
+
+
+# ===============================================================
+# Gráficos por escola (sem Streamlit: usados pelo app e por scripts)
+# ===============================================================
+def figura_redacao(dados, regional: str, escola: str) -> go.Figure:
+    """
+    Participação e média da escola em Redação, com as linhas pontilhadas
+    da regional. A escola precisa estar entre as escolas válidas.
+    """
+    validas_red = dados.escolas_validas("redacao", regional)
+    rotulo = validas_red.linha_por_escola[escola]
+
+    # Etapas e colunas descobertas nos cabeçalhos da planilha
+    etapas_red = dados.etapas["redacao"].etapas
+    cols_part_red = dados.colunas("redacao", "part")
+    cols_notas_red = dados.colunas("redacao", "notas")
+
+    # Série única (primeira linha)
+    part = para_exibicao(validas_red.linhas.loc[rotulo, cols_part_red])
+    notas = para_exibicao(validas_red.linhas.loc[rotulo, cols_notas_red])
+
+    part_frac   = part / 100.0
+    notas_norm  = notas / 1000.0
+    # Variações entre etapas (pré-calculadas para todas as escolas)
+    var_red       = dados.variacoes["redacao"]
+    var_part      = var_red["part"].absoluta.loc[rotulo]
+    var_part_rel  = var_red["part"].relativa.loc[rotulo]
+    var_notas     = var_red["notas"].absoluta.loc[rotulo]
+    var_notas_rel = var_red["notas"].relativa.loc[rotulo]
+    # Posição e percentil na regional e no estado (pré-calculados)
+    pos_red = dados.posicoes["redacao"]
+    pos_part_reg, pos_part_est   = textos_posicao(pos_red["part"], rotulo, cols_part_red)
+    pos_notas_reg, pos_notas_est = textos_posicao(pos_red["notas"], rotulo, cols_notas_red)
+
+
+    fig = go.Figure()
+
+    
+    # Participação (laranja, rótulo embaixo)
+    customdata_part = list(zip(
+        part,
+        formatar_variacao(var_part, sufixo="%"),
+        formatar_variacao(var_part_rel, sufixo="%"),
+        pos_part_reg,
+        pos_part_est,
+    ))
+    fig.add_trace(
+        go.Scatter(
+            x=etapas_red,
+            y=part_frac,
+            mode="lines+markers+text",
+            name="Participação da escola",
+            text=[f"{v:.2f}%" if pd.notna(v) else "" for v in part],
+            textposition="top center",
+            marker=dict(color="#FF8C00"),
+            line=dict(color="#FF8C00"),
+            customdata=customdata_part,
+            hovertemplate=(
+                "Etapa: %{x}<br>"
+                "Participação: %{customdata[0]:.2f}%<br>"
+                "Variação Absoluta: %{customdata[1]}<br>"
+                "Variação Relativa: %{customdata[2]}<br>"
+                "Na regional: %{customdata[3]}<br>"
+                "No estado: %{customdata[4]}<extra></extra>"
+            ),
+        )
+    )
+
+
+    # Notas (preto, rótulo em cima)
+    customdata_notas = list(zip(
+        notas,
+        formatar_variacao(var_notas),
+        formatar_variacao(var_notas_rel, sufixo="%"),
+        pos_notas_reg,
+        pos_notas_est,
+    ))
+    fig.add_trace(
+        go.Scatter(
+            x=etapas_red,
+            y=notas_norm,
+            mode="lines+markers+text",
+            name="Média da escola",
+            text=[f"{v:.2f}" if pd.notna(v) else "" for v in notas],
+            textposition="top center",
+            marker=dict(color="#000000"),
+            line=dict(color="#000000"),
+            customdata=customdata_notas,
+            hovertemplate=(
+                "Etapa: %{x}<br>"
+                "Nota: %{customdata[0]:.2f}<br>"
+                "Variação Absoluta: %{customdata[1]}<br>"
+                "Variação Relativa: %{customdata[2]}<br>"
+                "Na regional: %{customdata[3]}<br>"
+                "No estado: %{customdata[4]}<extra></extra>"
+            ),
+        )
+    )
+
+
+
+    # Série da REGIONAL (linha onde Escola ≈ nome da regional; sem ela, o
+    # agregado das escolas)
+    part_reg = dados.resumo_regional("redacao", regional, cols_part_red)
+    notas_reg = dados.resumo_regional("redacao", regional, cols_notas_red)
+
+    if part_reg is not None and notas_reg is not None:
+        part_reg = para_exibicao(part_reg)
+        notas_reg = para_exibicao(notas_reg)
+
+        part_reg_frac  = part_reg / 100.0
+        notas_reg_norm = notas_reg / 1000.0
+
+        # Linha pontilhada de PARTICIPAÇÃO da regional
+        fig.add_trace(
+            go.Scatter(
+                x=etapas_red,
+                y=part_reg_frac,
+                mode="lines+markers",
+                marker=dict(color="#FF8C00"),
+                name="Participação da regional",
+                line=dict(color="#FF8C00", dash="dot"),
+                hovertemplate=(
+                    "Etapa: %{x}<br>"
+                    "Participação da regional: %{y:.2%}<extra></extra>"
+                ),
+            )
+        )
+
+
+        # Linha pontilhada de NOTAS da regional
+        fig.add_trace(
+            go.Scatter(
+                x=etapas_red,
+                y=notas_reg_norm,
+                customdata=notas_reg,
+                mode="lines+markers",
+                marker=dict(color="#000000"),
+                name="Média da regional",
+                line=dict(color="#000000", dash="dot"),
+                hovertemplate=(
+                    "Etapa: %{x}<br>"
+                    "Nota (Regional): %{customdata:.2f}<extra></extra>"
+                ),
+            )
+        )
+
+
+    fig.update_layout(
+        title=dict(
+            text=f"Desempenhos em Redação: {escola}",
+            font=dict(size=26)  # só o título
+        ),
+        font=dict(size=16),     # resto (legenda, etc.)
+        height=800,
+        hoverlabel=dict(font_size=18),
+        legend=dict(
+        font=dict(size=16)  # <<< TAMANHO DA FONTE DA LEGENDA
+        ),
+        yaxis=dict(
+            title="",
+            range=[-0.2, 1.2],
+            showticklabels=False,
+        ),
+        xaxis=dict(
+            tickfont=dict(size=16)    # rótulos das etapas no eixo X
+        ),
+    )
+
+    return fig
+
+
+
+def figura_objetivas(dados, regional: str, escola: str) -> go.Figure:
+    """
+    Participação e acertos da escola nas Provas Objetivas, com as linhas
+    pontilhadas da regional. A escola precisa estar entre as escolas válidas.
+    """
+    validas_obj = dados.escolas_validas("objetivas", regional)
+    rotulo = validas_obj.linha_por_escola[escola]
+
+    etapas_obj = dados.etapas["objetivas"].etapas
+    cols_part_obj = dados.colunas("objetivas", "part")
+    cols_acertos_obj = dados.colunas("objetivas", "acertos")
+
+    # Séries da escola
+    part_obj    = para_exibicao(validas_obj.linhas.loc[rotulo, cols_part_obj])
+    acertos_obj = para_exibicao(validas_obj.linhas.loc[rotulo, cols_acertos_obj])
+
+    part_obj_frac    = part_obj / 100.0
+    acertos_obj_frac = acertos_obj / 100.0
+
+    var_obj         = dados.variacoes["objetivas"]
+    var_part_obj    = var_obj["part"].absoluta.loc[rotulo]
+    var_acertos_obj = var_obj["acertos"].absoluta.loc[rotulo]
+
+    pos_obj = dados.posicoes["objetivas"]
+    pos_part_reg, pos_part_est       = textos_posicao(pos_obj["part"], rotulo, cols_part_obj)
+    pos_acertos_reg, pos_acertos_est = textos_posicao(pos_obj["acertos"], rotulo, cols_acertos_obj)
+
+    fig_obj = go.Figure()
+
+    # -----------------------------------------------------------
+    # Traços da ESCOLA
+    # -----------------------------------------------------------
+    # Participação (escola)
+    customdata_part_obj = list(zip(
+        part_obj, formatar_variacao(var_part_obj, sufixo=" p.p."), pos_part_reg, pos_part_est
+    ))
+    fig_obj.add_trace(
+        go.Scatter(
+            x=etapas_obj,
+            y=part_obj_frac,
+            mode="lines+markers+text",
+            name="Participação da escola",
+            text=[f"{v:.2f}%" if pd.notna(v) else "" for v in part_obj],
+            textposition="top center",
+            marker=dict(color="#FF8C00"),
+            line=dict(color="#FF8C00"),
+            customdata=customdata_part_obj,
+            hovertemplate=(
+                "Etapa: %{x}<br>"
+                "Participação: %{customdata[0]:.2f}%<br>"
+                "Variação: %{customdata[1]}<br>"
+                "Na regional: %{customdata[2]}<br>"
+                "No estado: %{customdata[3]}<extra></extra>"
+            ),
+        )
+    )
+
+    # Acertos (escola)
+    customdata_acertos_obj = list(zip(
+        acertos_obj, formatar_variacao(var_acertos_obj, sufixo=" p.p."), pos_acertos_reg, pos_acertos_est
+    ))
+    fig_obj.add_trace(
+        go.Scatter(
+            x=etapas_obj,
+            y=acertos_obj_frac,
+            mode="lines+markers+text",
+            name="Média da escola",
+            text=[f"{v:.2f}%" if pd.notna(v) else "" for v in acertos_obj],
+            textposition="top center",
+            marker=dict(color="#000000"),
+            line=dict(color="#000000"),
+            customdata=customdata_acertos_obj,
+            hovertemplate=(
+                "Etapa: %{x}<br>"
+                "Acertos: %{customdata[0]:.2f}%<br>"
+                "Variação: %{customdata[1]}<br>"
+                "Na regional: %{customdata[2]}<br>"
+                "No estado: %{customdata[3]}<extra></extra>"
+            ),
+        )
+    )
+
+    # -----------------------------------------------------------
+    # Traços da REGIONAL (linha onde Escola ≈ nome da regional; sem ela,
+    # o agregado das escolas)
+    # -----------------------------------------------------------
+    part_obj_reg = dados.resumo_regional("objetivas", regional, cols_part_obj)
+    acertos_obj_reg = dados.resumo_regional("objetivas", regional, cols_acertos_obj)
+
+    if part_obj_reg is not None and acertos_obj_reg is not None:
+        part_obj_reg = para_exibicao(part_obj_reg)
+        acertos_obj_reg = para_exibicao(acertos_obj_reg)
+
+        part_obj_reg_frac    = part_obj_reg / 100.0
+        acertos_obj_reg_frac = acertos_obj_reg / 100.0
+
+        # Participação (Regional) – linha pontilhada laranja
+        fig_obj.add_trace(
+            go.Scatter(
+                x=etapas_obj,
+                y=part_obj_reg_frac,
+                mode="lines+markers",
+                marker=dict(color="#FF8C00"),
+                name="Participação da regional",
+                line=dict(color="#FF8C00", dash="dot"),
+                hovertemplate=(
+                    "Etapa: %{x}<br>"
+                    "Participação: %{y:.2%}<extra></extra>"
+                ),
+            )
+        )
+
+        # Acertos (Regional) – linha pontilhada preta
+        fig_obj.add_trace(
+            go.Scatter(
+                x=etapas_obj,
+                y=acertos_obj_reg_frac,
+                mode="lines+markers",
+                name="Média da regional",
+                marker=dict(color="#000000"),
+                line=dict(color="#000000", dash="dot"),
+                hovertemplate=(
+                    "Etapa: %{x}<br>"
+                    "Média da regional: %{y:.2%}<extra></extra>"
+                ),
+            )
+        )
+
+    # Layout do gráfico
+    fig_obj.update_layout(
+        title=dict(
+            text=f"Desempenhos nas Provas Objetivas: {escola}",
+            font=dict(size=26)
+        ),
+        font=dict(size=16),
+        height=800,
+        legend=dict(
+            font=dict(size=16)
+        ),
+        yaxis=dict(
+            title="",
+            range=[-0.2, 1.2],
+            showticklabels=False,
+        ),
+        xaxis=dict(
+            tickfont=dict(size=16)
+        ),
+        hoverlabel=dict(font_size=18),
+    )
+
+    return fig_obj
+
+
+
+def figura_participacao(dados, regional: str, escola: str) -> go.Figure:
+    """
+    Número de participantes da escola por avaliação, com variações e o
+    total da regional no hover.
+    """
+    particao_part = dados.particao("participacao", regional)
+    df_part_reg = particao_part.escolas
+    df_escola_part = df_part_reg[df_part_reg[COL_ESCOLA] == escola]
+
+    # "Número de Participantes: <etapa>", na ordem da planilha
+    cols_num_part = dados.colunas("participacao", "participantes")
+
+    # Valores da regional por avaliação (para aparecer no hover): linha-resumo
+    # ou, sem ela, a soma das escolas
+    linha_reg = dados.resumo_regional("participacao", regional, cols_num_part)
+    if linha_reg is not None:
+        reg_values = list(linha_reg)
+    else:
+        reg_values = [None] * len(cols_num_part)
+
+    # Considera a primeira linha da escola
+    linha = df_escola_part.iloc[0]
+    x_labels = dados.etapas["participacao"].etapas
+    y_values = [linha[c] for c in cols_num_part]
+
+    # Variações entre avaliações (pré-calculadas para todas as escolas)
+    var_participantes = dados.variacoes["participacao"]["participantes"]
+    var_abs = var_participantes.absoluta.loc[df_escola_part.index[0], cols_num_part]
+    var_rel = var_participantes.relativa.loc[df_escola_part.index[0], cols_num_part]
+
+    # Monta hover com variação abs., variação % e participantes da regional
+    hover_texts = []
+    for val, v_abs, v_rel, reg_val in zip(y_values, var_abs, var_rel, reg_values):
+        reg_str = fmt_int(reg_val) if reg_val is not None and not pd.isna(reg_val) else "-"
+
+        if pd.isna(val):
+            hover_texts.append(f"Participantes (Regional): {reg_str}")
+        elif pd.isna(v_abs):
+            # primeiro ponto (ou anterior faltante): só participantes da regional
+            hover_texts.append(
+                "<br>Participantes (Regional): "
+                + reg_str
+            )
+        else:
+            var_pct_str = "-" if pd.isna(v_rel) else f"{v_rel:.2f}%".replace(".", ",")
+            hover_texts.append(
+                "<br>Variação Absoluta: "
+                + fmt_int(v_abs)
+                + "<br>Variação Relativa: "
+                + var_pct_str
+                + "<br>Participantes (Regional): "
+                + reg_str
+            )
+
+    # Gráfico de linhas
+    fig_part = go.Figure()
+    fig_part.add_trace(
+        go.Scatter(
+            x=x_labels,
+            y=y_values,
+            mode="lines+markers+text",
+            name="Valores (Escola)",
+            text=[fmt_int(v) if not pd.isna(v) else "" for v in y_values],
+            textposition="top center",
+            hoverinfo="text",
+            hovertext=hover_texts,
+        )
+    )
+
+    fig_part.update_layout(
+        title=dict(
+            text=f"Tempos e Volumes de Participação: {escola}",
+            font=dict(size=24)
+        ),
+        font=dict(size=16),
+        height=600,
+        yaxis=dict(
+            title="",
+            showticklabels=False,
+        ),
+        xaxis=dict(
+            tickfont=dict(size=16)
+        ),
+        hoverlabel=dict(font_size=18),
+    )
+
+    return fig_part
+
+
+
+# ===============================================================
+# Comparação de várias escolas (traços montados em lote)
+# ===============================================================
+# Acima disso as escolas vão num único traço WebGL, sem legenda por escola
+LIMITE_TRACOS_INDIVIDUAIS = 12
+
+# série -> (rótulo, sufixo dos valores)
+ROTULOS_SERIES = {
+    "part": ("Participação", "%"),
+    "notas": ("Nota", ""),
+    "acertos": ("Acertos", "%"),
+}
+
+
+
+def figura_comparacao(dados, chave: str, regional: str, escolas, serie: str) -> go.Figure:
+    """
+    Sobrepõe uma série (participação, notas ou acertos) de várias escolas
+    da regional, até a regional inteira, com a linha da regional. Os valores
+    saem de uma vez da matriz de métricas. Com muitas escolas, todas vão num
+    só Scattergl, uma linha por escola separada por um ponto vazio, e o
+    navegador desenha um traço em vez de centenas.
+    """
+    validas = dados.escolas_validas(chave, regional)
+    etapas = list(dados.etapas[chave].etapas)
+    cols = dados.colunas(chave, serie)
+    rotulo_serie, sufixo = ROTULOS_SERIES[serie]
+
+    escolas = [e for e in escolas if e in validas.linha_por_escola]
+    rotulos = [validas.linha_por_escola[e] for e in escolas]
+    m = np.round(validas.linhas.loc[rotulos, cols].to_numpy(dtype="float64"), 4)
+
+    hover = "Etapa: %{x}<br>" + rotulo_serie + ": %{y:.2f}" + sufixo
+
+    fig = go.Figure()
+    if len(escolas) <= LIMITE_TRACOS_INDIVIDUAIS:
+        for escola, valores in zip(escolas, m):
+            fig.add_trace(
+                go.Scatter(
+                    x=etapas,
+                    y=valores,
+                    mode="lines+markers",
+                    name=escola,
+                    hovertemplate="%{fullData.name}<br>" + hover + "<extra></extra>",
+                )
+            )
+    else:
+        # uma linha por escola no mesmo traço: NaN no fim de cada uma
+        # interrompe a linha antes da próxima escola
+        n = len(etapas) + 1
+        fig.add_trace(
+            go.Scattergl(
+                x=(etapas + [None]) * len(escolas),
+                y=np.hstack([m, np.full((len(escolas), 1), np.nan)]).ravel(),
+                customdata=np.repeat(escolas, n),
+                mode="lines+markers",
+                name=f"{len(escolas)} escolas",
+                marker=dict(size=5, color="rgba(255,140,0,0.6)"),
+                line=dict(width=1, color="rgba(255,140,0,0.35)"),
+                connectgaps=False,
+                hovertemplate="%{customdata}<br>" + hover + "<extra></extra>",
+            )
+        )
+
+    resumo = dados.resumo_regional(chave, regional, cols)
+    if resumo is not None:
+        fig.add_trace(
+            go.Scatter(
+                x=etapas,
+                y=para_exibicao(resumo),
+                mode="lines+markers",
+                name="Regional",
+                marker=dict(color="#000000"),
+                line=dict(color="#000000", dash="dot", width=3),
+                hovertemplate="Regional<br>" + hover + "<extra></extra>",
+            )
+        )
+
+    fig.update_layout(
+        title=dict(
+            text=f"Comparação entre escolas: {rotulo_serie} ({regional})",
+            font=dict(size=24)
+        ),
+        font=dict(size=16),
+        height=700,
+        hoverlabel=dict(font_size=16),
+        yaxis=dict(title=rotulo_serie + (f" ({sufixo})" if sufixo else "")),
+        xaxis=dict(
+            tickfont=dict(size=16),
+            categoryorder="array",
+            categoryarray=etapas,
+        ),
+    )
+
+    return fig
+
+
+
+# aba -> função que monta a figura
+FIGURAS = {
+    "redacao": figura_redacao,
+    "objetivas": figura_objetivas,
+    "participacao": figura_participacao,
+}
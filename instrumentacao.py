@@ -0,0 +1,172 @@
+# instrumentacao.py
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Registros estruturados (uma linha JSON por evento) ficam num logger
+# próprio; com PAINEL_METRICAS_ARQUIVO eles também vão para um arquivo .jsonl
+logger = logging.getLogger("painel.metricas")
+
+if os.environ.get("PAINEL_METRICAS_ARQUIVO"):
+    _handler = logging.FileHandler(os.environ["PAINEL_METRICAS_ARQUIVO"], encoding="utf-8")
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+
+# ===============================================================
+# Registro do processo (todas as sessões) e do rerun em andamento
+# ===============================================================
+_lock = threading.Lock()
+_etapas = {}    # etapa -> [chamadas, segundos no total, maior tempo]
+_caches = {}    # cache -> [acertos, faltas]
+
+# Cada sessão do Streamlit roda o script na sua própria thread
+_local = threading.local()
+
+
+def registrar_tempo(etapa: str, segundos: float) -> None:
+    with _lock:
+        est = _etapas.setdefault(etapa, [0, 0.0, 0.0])
+        est[0] += 1
+        est[1] += segundos
+        est[2] = max(est[2], segundos)
+
+    rerun = getattr(_local, "rerun", None)
+    if rerun is not None:
+        rerun[etapa] = rerun.get(etapa, 0.0) + segundos
+
+
+@contextmanager
+def medir(etapa: str):
+    """
+    Cronometra o bloco: `with medir("tabela_redacao"): st.dataframe(...)`.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar_tempo(etapa, time.perf_counter() - inicio)
+
+
+def cronometrado(etapa: str):
+    """
+    Decorador equivalente a `medir` para funções inteiras.
+    """
+    def decorador(funcao):
+        @wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with medir(etapa):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+
+# ===============================================================
+# Acertos e faltas de cache
+# ===============================================================
+def contar_cache(cache: str, acerto: bool) -> None:
+    with _lock:
+        contagem = _caches.setdefault(cache, [0, 0])
+        contagem[0 if acerto else 1] += 1
+
+
+def marcar_falta() -> None:
+    """
+    Chamada dentro do corpo de uma função em cache do Streamlit: o corpo só
+    roda quando o valor não estava no cache.
+    """
+    _local.falta = True
+
+
+def chamar_em_cache(cache: str, funcao, *args, **kwargs):
+    """
+    Chama uma função em cache (st.cache_data/st.cache_resource) contando
+    acerto ou falta, conforme o corpo dela tenha chamado marcar_falta().
+    """
+    _local.falta = False
+    with medir(cache):
+        resultado = funcao(*args, **kwargs)
+    contar_cache(cache, acerto=not _local.falta)
+    return resultado
+
+
+# ===============================================================
+# Rerun: tempos por etapa e registro estruturado
+# ===============================================================
+def iniciar_rerun() -> None:
+    _local.rerun = {}
+    _local.inicio_rerun = time.perf_counter()
+
+
+def rerun_em_andamento() -> bool:
+    """
+    Indica se a thread atual está dentro de um rerun completo do script
+    (entre iniciar_rerun e finalizar_rerun). Um fragmento reexecutado
+    sozinho (st.fragment) encontra False aqui.
+    """
+    return getattr(_local, "rerun", None) is not None
+
+
+def finalizar_rerun(evento: str = "rerun", **contexto) -> dict:
+    """
+    Encerra o rerun da thread atual e grava uma linha JSON com o tempo total,
+    o tempo de cada etapa e o contexto informado (aba, regional...).
+    Reruns interrompidos por st.stop() não chegam aqui; as etapas deles
+    continuam contando no registro do processo.
+    """
+    etapas = getattr(_local, "rerun", None) or {}
+    total = time.perf_counter() - getattr(_local, "inicio_rerun", time.perf_counter())
+    _local.rerun = None
+    registrar_tempo(evento, total)
+
+    registro = {
+        "evento": evento,
+        "total_ms": round(total * 1000, 2),
+        "etapas_ms": {k: round(v * 1000, 2) for k, v in etapas.items()},
+        **contexto,
+    }
+    logger.info(json.dumps(registro, ensure_ascii=False, default=str))
+    return registro
+
+
+# ===============================================================
+# Consulta (painel de diagnóstico)
+# ===============================================================
+def resumo_etapas() -> list:
+    with _lock:
+        itens = [(k, list(v)) for k, v in _etapas.items()]
+    return [
+        {
+            "etapa": etapa,
+            "chamadas": chamadas,
+            "total_ms": round(total * 1000, 2),
+            "media_ms": round(total * 1000 / chamadas, 2),
+            "max_ms": round(maximo * 1000, 2),
+        }
+        for etapa, (chamadas, total, maximo) in sorted(itens, key=lambda i: -i[1][1])
+    ]
+
+
+def resumo_caches() -> list:
+    with _lock:
+        itens = [(k, list(v)) for k, v in _caches.items()]
+    return [
+        {
+            "cache": cache,
+            "acertos": acertos,
+            "faltas": faltas,
+            "taxa_acerto": round(acertos / (acertos + faltas), 3) if acertos + faltas else None,
+        }
+        for cache, (acertos, faltas) in sorted(itens)
+    ]
+
+
+def zerar() -> None:
+    with _lock:
+        _etapas.clear()
+        _caches.clear()
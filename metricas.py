@@ -0,0 +1,183 @@
+# metricas.py
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+# ===============================================================
+# Variação entre etapas (vetorizada)
+# ===============================================================
+class Variacoes(NamedTuple):
+    absoluta: pd.DataFrame  # valor da etapa - valor da etapa anterior
+    relativa: pd.DataFrame  # variação absoluta em % do valor anterior
+
+
+def calcular_variacoes(df_: pd.DataFrame, colunas) -> Variacoes:
+    """
+    Variação (com sinal) de cada etapa em relação à anterior, para todas as
+    linhas de uma vez. A primeira etapa, etapas com valor faltante e
+    variações relativas sobre zero ficam NaN.
+    """
+    m = df_[colunas].to_numpy(dtype=float)
+
+    absoluta = np.full_like(m, np.nan)
+    relativa = np.full_like(m, np.nan)
+    if m.shape[1] > 1:
+        anterior = m[:, :-1]
+        absoluta[:, 1:] = m[:, 1:] - anterior
+        with np.errstate(divide="ignore", invalid="ignore"):
+            relativa[:, 1:] = np.where(anterior != 0, 100 * absoluta[:, 1:] / anterior, np.nan)
+
+    return Variacoes(
+        absoluta=pd.DataFrame(absoluta, index=df_.index, columns=colunas),
+        relativa=pd.DataFrame(relativa, index=df_.index, columns=colunas),
+    )
+
+
+def formatar_variacao(valores, casas: int = 2, sufixo: str = "") -> list:
+    """
+    Textos para hover: '12.34' + sufixo, ou '-' quando não há variação.
+    """
+    return ["-" if pd.isna(v) else f"{v:.{casas}f}{sufixo}" for v in valores]
+
+
+def colunas_variacao(variacoes: Variacoes, colunas, indice, escala: float = 1.0) -> dict:
+    """
+    Colunas 'Δ <coluna>' (variação absoluta para a etapa anterior) das
+    linhas indicadas, prontas para DataFrame.assign. A primeira etapa não
+    tem variação e fica de fora.
+    """
+    return {
+        f"Δ {c}": variacoes.absoluta.loc[indice, c] * escala
+        for c in colunas[1:]
+    }
+
+
+# ===============================================================
+# Posição e percentil das escolas (na regional e no estado)
+# ===============================================================
+class Posicoes(NamedTuple):
+    posicao_regional: pd.DataFrame    # 1 = maior valor entre as escolas da regional
+    percentil_regional: pd.DataFrame  # % das escolas da regional com valor menor ou igual
+    total_regional: pd.DataFrame      # escolas da regional com valor na etapa
+    posicao_estado: pd.DataFrame
+    percentil_estado: pd.DataFrame
+    total_estado: pd.DataFrame
+
+
+def calcular_posicoes(df_: pd.DataFrame, colunas, regionais: pd.Series, escolas: pd.Series) -> Posicoes:
+    """
+    Posições (empates ficam com a melhor posição) e percentis de todas as
+    escolas, em todas as etapas de uma vez. Só entram as linhas marcadas em
+    `escolas` (sem as linhas-resumo); as demais e os valores faltantes
+    ficam NaN.
+    """
+    m = df_.loc[escolas, colunas].astype("float64")
+    por_regional = m.groupby(regionais[escolas], observed=True, sort=False)
+
+    def completar(parcial: pd.DataFrame) -> pd.DataFrame:
+        return parcial.reindex(df_.index).astype("float32")
+
+    return Posicoes(
+        posicao_regional=completar(por_regional.rank(method="min", ascending=False)),
+        percentil_regional=completar(100 * por_regional.rank(method="max", pct=True)),
+        total_regional=completar(por_regional.transform("count").where(m.notna())),
+        posicao_estado=completar(m.rank(method="min", ascending=False)),
+        percentil_estado=completar(100 * m.rank(method="max", pct=True)),
+        total_estado=completar(pd.DataFrame(
+            np.broadcast_to(m.notna().sum().to_numpy(), m.shape), index=m.index, columns=m.columns
+        ).where(m.notna())),
+    )
+
+
+def formatar_posicao(posicao, total, percentil) -> list:
+    """
+    Textos para hover: '3º de 45 (percentil 94)', ou '-' sem posição.
+    """
+    return [
+        "-" if pd.isna(p) else f"{int(p)}º de {int(t)} (percentil {pc:.0f})"
+        for p, t, pc in zip(posicao, total, percentil)
+    ]
+
+
+def colunas_posicao(posicoes: Posicoes, colunas, indice) -> dict:
+    """
+    Colunas de posição e percentil (regional e estado) de cada etapa, das
+    linhas indicadas, prontas para DataFrame.assign.
+    """
+    novas = {}
+    for c in colunas:
+        novas[f"{c} – posição na regional"] = posicoes.posicao_regional.loc[indice, c]
+        novas[f"{c} – percentil na regional"] = posicoes.percentil_regional.loc[indice, c]
+        novas[f"{c} – posição no estado"] = posicoes.posicao_estado.loc[indice, c]
+        novas[f"{c} – percentil no estado"] = posicoes.percentil_estado.loc[indice, c]
+    return novas
+
+
+# ===============================================================
+# Agregados por regional e do estado (a partir das linhas de escola)
+# ===============================================================
+class Agregados(NamedTuple):
+    regional: pd.DataFrame  # uma linha por regional, colunas = etapas
+    estado: pd.Series       # todas as escolas do estado, por etapa
+
+
+def _termos_agregacao(x: np.ndarray, w: np.ndarray, regra: str):
+    """
+    Numerador e denominador de cada escola/etapa: o agregado de um grupo é
+    Σ numerador / Σ denominador. Escolas sem valor (ou sem peso) ficam com
+    os dois zerados e não pesam no grupo.
+    """
+    ok = ~np.isnan(x) & ~np.isnan(w)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if regra == "soma":
+            num, den = x, np.ones_like(x)
+        elif regra == "taxa":
+            # participação %: Σ participantes / Σ matriculados (participantes / taxa)
+            ok &= x > 0
+            num, den = w, w / x
+        else:
+            num, den = x * w, w
+    return np.where(ok, num, 0.0), np.where(ok, den, 0.0)
+
+
+def calcular_agregados(df_: pd.DataFrame, colunas, regionais: pd.Series,
+                       regra: str = "media", pesos: np.ndarray = None) -> Agregados:
+    """
+    Agregado das escolas de cada regional e do estado, em todas as etapas
+    com um único groupby. Regras: "soma" (contagens), "media" (média
+    simples), "ponderada" (média ponderada por `pesos`) e "taxa" (percentual
+    agregado a partir dos `pesos`, ver _termos_agregacao). `pesos` tem uma
+    coluna por etapa; etapas sem nenhum peso usam a média simples. Etapas
+    sem escolas com valor ficam NaN.
+    """
+    x = df_[colunas].to_numpy(dtype="float64")
+    uns = np.ones_like(x)
+    if regra in ("ponderada", "taxa") and pesos is not None:
+        w = np.asarray(pesos, dtype="float64")
+        sem_peso = np.isnan(w).all(axis=0)
+        num, den = _termos_agregacao(x, np.where(sem_peso, 1.0, w), regra)
+        num_media, den_media = _termos_agregacao(x, uns, "media")
+        num = np.where(sem_peso, num_media, num)
+        den = np.where(sem_peso, den_media, den)
+    else:
+        num, den = _termos_agregacao(x, uns, "soma" if regra == "soma" else "media")
+
+    # numeradores e denominadores lado a lado: uma soma por regional
+    n = len(colunas)
+    somas = (
+        pd.DataFrame(np.hstack([num, den]), index=df_.index)
+        .groupby(regionais, observed=True, sort=False)
+        .sum()
+    )
+    totais = np.concatenate([num.sum(axis=0), den.sum(axis=0)])
+
+    def dividir(s: np.ndarray) -> np.ndarray:
+        valor = s[..., :n] if regra == "soma" else s[..., :n] / np.where(s[..., n:] > 0, s[..., n:], 1.0)
+        return np.where(s[..., n:] > 0, valor, np.nan)
+
+    return Agregados(
+        regional=pd.DataFrame(dividir(somas.to_numpy()), index=somas.index, columns=colunas),
+        estado=pd.Series(dividir(totais), index=colunas),
+    )
@@ -0,0 +1,195 @@
+# qualidade.py
+import argparse
+import os
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from dados import (
+    ABAS,
+    ARQUIVO_DADOS,
+    COL_ESCOLA,
+    COL_REGIONAL,
+    SERIES_COMPLETUDE,
+    ConjuntoDados,
+    carregar_dados,
+    codigos_escola,
+    colunas_numericas,
+    mascara_resumo,
+)
+from metricas import calcular_agregados
+
+
+# ===============================================================
+# Configuração
+# ===============================================================
+# Abas com uma linha por escola e uma linha-resumo por regional
+ABAS_ESCOLAS = ("redacao", "objetivas", "participacao", "acessos")
+
+# Diferença relativa tolerada entre a linha-resumo e o agregado das escolas
+TOLERANCIA_RESUMO = 0.02
+
+
+class RelatorioQualidade(NamedTuple):
+    nao_convertidas: pd.DataFrame      # células que não eram número no Excel
+    faltantes: pd.DataFrame            # valores de etapa ausentes por escola
+    resumos_ausentes: pd.DataFrame     # regionais sem linha-resumo
+    codigos_duplicados: pd.DataFrame   # escolas com o mesmo código na aba
+    resumos_divergentes: pd.DataFrame  # linha-resumo x agregado das escolas
+
+
+# ===============================================================
+# Verificações (vetorizadas por aba)
+# ===============================================================
+def _colunas_metricas(dados: ConjuntoDados, chave: str) -> dict:
+    """
+    série -> colunas numéricas da aba (acessos: uma série só, "acessos").
+    """
+    if dados.etapas[chave].series:
+        return dados.etapas[chave].series
+    cols_pct, cols_dec = colunas_numericas(chave, dados[chave])
+    return {chave: cols_pct + cols_dec}
+
+
+def valores_faltantes(dados: ConjuntoDados) -> pd.DataFrame:
+    """
+    Uma linha por (escola, coluna de etapa) sem valor. Nas abas de redação e
+    objetivas a escola sai da lista de escolas válidas por causa disso.
+    """
+    partes = []
+    for chave in ABAS_ESCOLAS:
+        df_ = dados[chave]
+        cols = sum(dados.etapas[chave].series.values(), [])
+        if not cols:
+            continue
+        escolas = df_[~mascara_resumo(df_).to_numpy()]
+        linhas, colunas = np.nonzero(escolas[cols].isna().to_numpy())
+        partes.append(pd.DataFrame({
+            "aba": ABAS[chave],
+            "regional": escolas[COL_REGIONAL].to_numpy(dtype=object)[linhas],
+            "escola": escolas[COL_ESCOLA].to_numpy(dtype=object)[linhas],
+            "coluna": np.asarray(cols, dtype=object)[colunas],
+            "fora_das_validas": chave in SERIES_COMPLETUDE,
+        }))
+    return _juntar(partes, ["aba", "regional", "escola", "coluna", "fora_das_validas"])
+
+
+def resumos_ausentes(dados: ConjuntoDados) -> pd.DataFrame:
+    """
+    Regionais sem a linha-resumo (Escola = nome da regional) em cada aba.
+    """
+    partes = []
+    for chave in ABAS_ESCOLAS:
+        df_ = dados[chave]
+        tem_resumo = mascara_resumo(df_).groupby(df_[COL_REGIONAL], observed=True).any()
+        sem = tem_resumo.index[~tem_resumo.to_numpy()]
+        partes.append(pd.DataFrame({"aba": ABAS[chave], "regional": np.asarray(sem, dtype=object)}))
+    return _juntar(partes, ["aba", "regional"])
+
+
+def codigos_duplicados(dados: ConjuntoDados) -> pd.DataFrame:
+    """
+    Linhas de escola cujo código aparece mais de uma vez na mesma aba.
+    """
+    partes = []
+    for chave in ABAS_ESCOLAS:
+        df_ = dados[chave]
+        escolas = df_[~mascara_resumo(df_).to_numpy()]
+        codigos = codigos_escola(escolas)
+        repetido = (codigos.notna() & codigos.duplicated(keep=False)).to_numpy()
+        partes.append(pd.DataFrame({
+            "aba": ABAS[chave],
+            "codigo": codigos.to_numpy(dtype=object)[repetido],
+            "regional": escolas[COL_REGIONAL].to_numpy(dtype=object)[repetido],
+            "escola": escolas[COL_ESCOLA].to_numpy(dtype=object)[repetido],
+        }))
+    tabela = _juntar(partes, ["aba", "codigo", "regional", "escola"])
+    return tabela.sort_values(["aba", "codigo"], ignore_index=True)
+
+
+def agregados_escolas(dados: ConjuntoDados, chave: str, serie: str, cols: list) -> pd.DataFrame:
+    """
+    Agregado das escolas de cada regional (linhas = regionais), pelas
+    regras de dados.REGRAS_AGREGACAO (já calculado na versão). A aba de
+    acessos, sem etapas, usa a média simples.
+    """
+    agregados = dados.agregados.get(chave, {}).get(serie)
+    if agregados is None:
+        df_ = dados[chave]
+        escolas = df_[~mascara_resumo(df_).to_numpy()]
+        agregados = calcular_agregados(escolas, cols, escolas[COL_REGIONAL])
+    return agregados.regional
+
+
+def resumos_divergentes(dados: ConjuntoDados) -> pd.DataFrame:
+    """
+    Células da linha-resumo que diferem do agregado das escolas da regional
+    em mais que TOLERANCIA_RESUMO (relativa).
+    """
+    partes = []
+    for chave in ABAS_ESCOLAS:
+        df_ = dados[chave]
+        eh_resumo = mascara_resumo(df_).to_numpy()
+        for serie, cols in _colunas_metricas(dados, chave).items():
+            if not cols:
+                continue
+            resumo = df_[eh_resumo].groupby(COL_REGIONAL, observed=True)[cols].first()
+            agregado = agregados_escolas(dados, chave, serie, cols).reindex(resumo.index)
+
+            r = resumo.to_numpy(dtype="float64")
+            a = agregado.to_numpy(dtype="float64")
+            with np.errstate(invalid="ignore"):
+                diverge = np.abs(r - a) > TOLERANCIA_RESUMO * np.maximum(np.abs(a), 1.0)
+            linhas, colunas = np.nonzero(diverge)
+            partes.append(pd.DataFrame({
+                "aba": ABAS[chave],
+                "regional": np.asarray(resumo.index, dtype=object)[linhas],
+                "coluna": np.asarray(cols, dtype=object)[colunas],
+                "resumo": r[linhas, colunas],
+                "agregado": a[linhas, colunas],
+                "diferenca": (r - a)[linhas, colunas],
+            }))
+    return _juntar(partes, ["aba", "regional", "coluna", "resumo", "agregado", "diferenca"])
+
+
+def _juntar(partes: list, colunas: list) -> pd.DataFrame:
+    if not partes:
+        return pd.DataFrame(columns=colunas)
+    return pd.concat(partes, ignore_index=True)[colunas]
+
+
+def avaliar_qualidade(dados: ConjuntoDados) -> RelatorioQualidade:
+    """
+    Relatório completo de uma versão dos dados. As células não convertidas
+    foram registradas na normalização (e vêm do snapshot); o resto é
+    calculado sobre as abas tipadas.
+    """
+    return RelatorioQualidade(
+        nao_convertidas=dados.nao_convertidas,
+        faltantes=valores_faltantes(dados),
+        resumos_ausentes=resumos_ausentes(dados),
+        codigos_duplicados=codigos_duplicados(dados),
+        resumos_divergentes=resumos_divergentes(dados),
+    )
+
+
+# ===============================================================
+# Linha de comando
+# ===============================================================
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Relatório de qualidade dos dados da planilha")
+    parser.add_argument("--planilha", default=ARQUIVO_DADOS)
+    parser.add_argument("--saida", help="grava cada verificação em <saida>/<nome>.csv")
+    args = parser.parse_args(argv)
+
+    relatorio = avaliar_qualidade(carregar_dados(args.planilha))
+    for nome, tabela in relatorio._asdict().items():
+        print(f"{nome:<22} {len(tabela):>6}")
+        if args.saida:
+            os.makedirs(args.saida, exist_ok=True)
+            tabela.to_csv(os.path.join(args.saida, f"{nome}.csv"), sep=";", decimal=",", index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+# relatorios.py
+import argparse
+import hashlib
+import importlib.util
+import inspect
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import pandas as pd
+
+from dados import ARQUIVO_DADOS, COL_CODIGO, COL_ESCOLA, DIR_SNAPSHOT, carregar_dados
+import dados as modulo_dados
+import graficos
+import metricas
+from graficos import FIGURAS
+
+logger = logging.getLogger(__name__)
+
+
+# ===============================================================
+# Configuração da exportação
+# ===============================================================
+# Incrementar quando o layout exportado mudar (força gerar tudo de novo)
+FORMATO_RELATORIO = 1
+
+# Abas com gráfico por escola exportadas pelo relatório
+ABAS_RELATORIO = ("redacao", "objetivas")
+
+# Largura das imagens (a altura vem do layout de cada figura)
+LARGURA_IMAGEM = 1400
+
+ARQUIVO_MANIFESTO = "manifesto.json"
+
+# Dados da planilha em cada processo de trabalho (ver _iniciar_processo)
+_dados = None
+
+
+def _iniciar_processo(planilha: str, dir_snapshot: str) -> None:
+    # o snapshot já foi gravado pelo processo principal: aqui só é aberto
+    # com memory-map, sem reler o Excel
+    global _dados
+    _dados = carregar_dados(planilha, dir_snapshot)
+
+
+def nome_arquivo(texto) -> str:
+    """
+    Nome seguro para arquivo/pasta: 'C.E. João / Anexo' -> 'C_E_ João _ Anexo'.
+    """
+    return re.sub(r"[^\w\- ]+", "_", str(texto)).strip() or "_"
+
+
+# Código que monta as figuras: os gráficos e o que eles chamam (variações e
+# posições em metricas, linha da regional e agregados em dados). Mudou um
+# deles, muda a assinatura
+_CODIGO_GRAFICOS = hashlib.sha256(
+    "".join(inspect.getsource(m) for m in (graficos, metricas, modulo_dados)).encode()
+).hexdigest()
+
+
+def assinatura_conteudo(conteudo: str, formato: str) -> str:
+    h = hashlib.sha256(f"{FORMATO_RELATORIO}|{_CODIGO_GRAFICOS}|{formato}|".encode())
+    h.update(conteudo.encode())
+    return h.hexdigest()
+
+
+def dados_da_figura(dados, chave: str, regional: str, escola: str) -> str:
+    """
+    Tudo de que a figura da escola depende (linha da escola, valores da
+    regional e posições da escola), serializado. Bem mais barato que montar
+    a figura, então a checagem de "não mudou" não custa um gráfico por escola.
+    """
+    rotulo = dados.escolas_validas(chave, regional).linha_por_escola[escola]
+    # linha da regional como a figura usa: sem linha-resumo, vem do agregado
+    # das escolas, que muda quando qualquer escola da regional muda
+    valores_regional = [
+        dados.resumo_regional(chave, regional, cols)
+        for cols in dados.etapas[chave].series.values()
+    ]
+    valores_regional = [None if v is None else v.round(4).tolist() for v in valores_regional]
+    # posições dependem das outras escolas: entram pelo valor já calculado
+    posicoes = [
+        tabela.loc[[rotulo]]
+        for posicoes_serie in dados.posicoes[chave].values()
+        for tabela in posicoes_serie
+    ]
+    return (
+        dados[chave].loc[[rotulo]].to_json(orient="split")
+        + json.dumps(valores_regional)
+        + pd.concat(posicoes, axis=1).to_json(orient="split")
+    )
+
+
+# ===============================================================
+# Tabelas da regional (mesmas colunas do painel)
+# ===============================================================
+def tabelas_regional(dados, regional: str) -> dict:
+    """
+    Tabelas de Redação e Objetivas da regional (escolas + linha-resumo),
+    com percentuais em pontos percentuais, como na planilha.
+    """
+    tabelas = {}
+    for chave in ABAS_RELATORIO:
+        cols = [
+            c for serie in dados.etapas[chave].series.values() for c in serie
+        ]
+        df_reg = dados.particao(chave, regional).todas
+        if not df_reg.empty:
+            tabelas[chave] = df_reg[[COL_CODIGO, COL_ESCOLA] + cols]
+    return tabelas
+
+
+# ===============================================================
+# Exportação de uma regional (roda num processo de trabalho)
+# ===============================================================
+def gravar_figura(fig, destino: str, formato: str) -> None:
+    if formato == "html":
+        # plotly.js pelo CDN: cada arquivo fica com poucos KB
+        fig.write_html(destino, include_plotlyjs="cdn")
+    else:
+        fig.write_image(destino, format=formato, width=LARGURA_IMAGEM)
+
+
+def exportar_regional(regional: str, saida: str, formato: str, anteriores: dict):
+    """
+    Gera os gráficos de todas as escolas válidas da regional e as tabelas da
+    regional. Uma saída só é regravada quando o que ela mostra (dados da
+    escola/regional ou CSV da tabela) mudou desde a última exportação ou o
+    arquivo sumiu.
+    Retorna ({caminho relativo: assinatura}, quantidade gravada).
+    """
+    dados = _dados
+    pasta_regional = nome_arquivo(regional)
+    assinaturas, gravados = {}, 0
+
+    def precisa_gravar(relativo: str, assinatura: str) -> bool:
+        assinaturas[relativo] = assinatura
+        destino = os.path.join(saida, relativo)
+        if anteriores.get(relativo) == assinatura and os.path.exists(destino):
+            return False
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        return True
+
+    for chave in ABAS_RELATORIO:
+        for escola in dados.escolas_validas(chave, regional).nomes:
+            relativo = os.path.join(pasta_regional, nome_arquivo(escola), f"{chave}.{formato}")
+            assinatura = assinatura_conteudo(dados_da_figura(dados, chave, regional, escola), formato)
+            if precisa_gravar(relativo, assinatura):
+                fig = FIGURAS[chave](dados, regional, escola)
+                gravar_figura(fig, os.path.join(saida, relativo), formato)
+                gravados += 1
+
+    for chave, df_tabela in tabelas_regional(dados, regional).items():
+        # separador e decimal do Excel em português
+        csv = df_tabela.to_csv(sep=";", decimal=",", index=False)
+        relativo = os.path.join(pasta_regional, f"tabela_{chave}.csv")
+        if precisa_gravar(relativo, assinatura_conteudo(csv, "csv")):
+            with open(os.path.join(saida, relativo), "w", encoding="utf-8-sig", newline="") as f:
+                f.write(csv)
+            gravados += 1
+
+    return assinaturas, gravados
+
+
+# ===============================================================
+# Manifesto: assinatura de cada saída da última exportação
+# ===============================================================
+def ler_manifesto(saida: str) -> dict:
+    caminho = os.path.join(saida, ARQUIVO_MANIFESTO)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f).get("saidas", {})
+
+
+def salvar_manifesto(saida: str, versao: str, saidas: dict) -> None:
+    caminho = os.path.join(saida, ARQUIVO_MANIFESTO)
+    tmp = f"{caminho}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"versao": versao, "formato": FORMATO_RELATORIO, "saidas": saidas},
+                  f, ensure_ascii=False, indent=1)
+    os.replace(tmp, caminho)
+
+
+# ===============================================================
+# Linha de comando
+# ===============================================================
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Exporta os gráficos de todas as escolas e as tabelas de cada regional"
+    )
+    parser.add_argument("--planilha", default=ARQUIVO_DADOS,
+                        help="Excel de origem (ver `python catalogo.py listar`)")
+    parser.add_argument("--saida", default="relatorios")
+    parser.add_argument("--formato", choices=("png", "pdf", "svg", "html"), default="png")
+    parser.add_argument("--regional", action="append",
+                        help="exporta só esta regional (pode repetir)")
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--dir-snapshot", default=DIR_SNAPSHOT)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    formato = args.formato
+    if formato != "html" and importlib.util.find_spec("kaleido") is None:
+        parser.error(f"--formato {formato} precisa do kaleido (pip install kaleido); ou use --formato html")
+
+    inicio = time.perf_counter()
+    # também grava o snapshot que os processos de trabalho vão abrir
+    dados = carregar_dados(args.planilha, args.dir_snapshot)
+
+    regionais = sorted({
+        regional for chave in ABAS_RELATORIO for regional in dados.indice[chave]
+    })
+    if args.regional:
+        desconhecidas = set(args.regional) - set(regionais)
+        if desconhecidas:
+            parser.error(f"regional não encontrada: {', '.join(sorted(desconhecidas))}")
+        regionais = [r for r in regionais if r in args.regional]
+
+    os.makedirs(args.saida, exist_ok=True)
+    manifesto = ler_manifesto(args.saida)
+    anteriores = [
+        {k: v for k, v in manifesto.items() if k.startswith(nome_arquivo(r) + os.sep)}
+        for r in regionais
+    ]
+
+    processos = max(1, min(args.processos, len(regionais)))
+    tarefas = (regionais, repeat(args.saida), repeat(formato), anteriores)
+    if processos > 1:
+        with ProcessPoolExecutor(
+            max_workers=processos,
+            initializer=_iniciar_processo,
+            initargs=(args.planilha, args.dir_snapshot),
+        ) as pool:
+            resultados = list(pool.map(exportar_regional, *tarefas))
+    else:
+        global _dados
+        _dados = dados
+        resultados = list(map(exportar_regional, *tarefas))
+
+    # regionais fora desta execução mantêm as entradas antigas
+    for anteriores_reg in anteriores:
+        for relativo in anteriores_reg:
+            manifesto.pop(relativo, None)
+    total, gravados = 0, 0
+    for assinaturas, n in resultados:
+        manifesto.update(assinaturas)
+        total += len(assinaturas)
+        gravados += n
+    salvar_manifesto(args.saida, dados.versao, manifesto)
+
+    logger.info(
+        "%d regionais, %d saídas (%d gravadas, %d sem mudança) em %.1fs",
+        len(regionais), total, gravados, total - gravados, time.perf_counter() - inicio,
+    )
+
+
+if __name__ == "__main__":
+    main()
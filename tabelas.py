@@ -0,0 +1,68 @@
+# tabelas.py
+import math
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from busca import dobrar
+
+
+# ===============================================================
+# Filtro, ordenação e paginação no servidor (sem Streamlit)
+# ===============================================================
+class Pagina(NamedTuple):
+    posicoes: np.ndarray  # posições (iloc) das linhas da página, já ordenadas
+    total: int            # linhas que passaram no filtro
+    pagina: int           # página exibida (1 em diante)
+    paginas: int
+
+
+def filtrar_por_nome(serie: pd.Series, termo: str) -> np.ndarray:
+    """
+    Máscara das linhas cujo nome contém o termo (sem acentos e sem caixa).
+    Em colunas categóricas o texto é dobrado uma vez por categoria, não
+    por linha.
+    """
+    termo = dobrar(termo)
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        nomes = pd.Series([dobrar(c) for c in serie.cat.categories], dtype=object)
+        contem = nomes.str.contains(termo, regex=False).to_numpy(dtype=bool)
+        codigos = serie.cat.codes.to_numpy()
+        if not len(contem):
+            return np.zeros(len(serie), dtype=bool)
+        return (codigos >= 0) & contem[codigos]
+    return serie.map(dobrar).str.contains(termo, regex=False).to_numpy(dtype=bool)
+
+
+def ordenar_posicoes(serie: pd.Series, posicoes: np.ndarray, crescente: bool = True) -> np.ndarray:
+    """
+    Ordena as posições pelo valor da coluna. Em colunas numéricas os
+    faltantes ficam sempre no fim, nos dois sentidos.
+    """
+    valores = serie.to_numpy()[posicoes]
+    if valores.dtype.kind == "f":
+        chave = valores if crescente else -valores
+        ordem = np.lexsort((chave, np.isnan(valores)))
+    else:
+        ordem = np.argsort(valores.astype(str), kind="stable")
+        if not crescente:
+            ordem = ordem[::-1]
+    return posicoes[ordem]
+
+
+def paginar(df_: pd.DataFrame, coluna_nome: str, termo: str, coluna_ordem: str,
+            crescente: bool, tamanho: int, pagina: int) -> Pagina:
+    """
+    Aplica filtro por nome e ordenação sobre as colunas tipadas e devolve só
+    as posições da página pedida (ajustada ao número de páginas).
+    """
+    posicoes = np.arange(len(df_))
+    if termo:
+        posicoes = posicoes[filtrar_por_nome(df_[coluna_nome], termo)]
+    posicoes = ordenar_posicoes(df_[coluna_ordem], posicoes, crescente)
+
+    paginas = max(1, math.ceil(len(posicoes) / tamanho))
+    pagina = min(max(1, pagina), paginas)
+    inicio = (pagina - 1) * tamanho
+    return Pagina(posicoes[inicio:inicio + tamanho], len(posicoes), pagina, paginas)